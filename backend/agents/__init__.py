@@ -1,5 +1,11 @@
 """Agents package initialization."""
-from .extraction_agent import extraction_agent
-from .verification_agent import verification_agent
+from importlib import import_module
 
 __all__ = ["extraction_agent", "verification_agent"]
+
+
+def __getattr__(name):
+    # Agents pull in the Vertex AI / OpenAI SDKs; import them on first use only
+    if name in __all__:
+        return getattr(import_module(f".{name}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,27 +5,111 @@ Implements intelligent claim detection with context awareness.
 import logging
 from typing import List, Dict, Optional, Callable, Any
 import asyncio
-import json
 import re
+import orjson
+from itertools import islice
 
+from config import settings
 from utils.vertex_client import vertex_client
+from utils.json_stream import JsonArrayStreamer
 from core.thinking_refiner import ThinkingRefiner
+from agents.extraction_cache import extraction_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
+# The prompt is split around the article text so the prefix stays byte-identical
+# across requests (friendly to provider-side prompt caching).
+_EXTRACTION_PROMPT_HEADER = """You are a professional fact-checker. Analyze the following article and extract EVERY individual verifiable factual claim.
+
+Typical articles contain 5-15 distinct claims. Extract each one separately.
+
+Article text:
+\"\"\"
+"""
+
+_EXTRACTION_PROMPT_FOOTER = """
+\"\"\"
+
+Return your response AS ONLY A VALID JSON ARRAY. 
+Each object in the array MUST have this structure:
+{
+    "claim": "The specific factual statement",
+    "verbatim": "The EXACT line or sentence from the article (must be verbatim)",
+    "context": "Surrounding context from the original text",
+    "type": "statistical|historical|scientific|attribution|general",
+    "is_quote": true|false,
+    "confidence": 0.0-1.0
+}
+
+IMPORTANT: 
+- The "verbatim" field MUST BE AN EXACT SUBSTRTING from the article.
+- Return ONLY the JSON array. Don't add text before or after.
+"""
+
+# Bump to invalidate cached extractions without editing the prompt text
+PROMPT_VERSION = "v1"
+_PROMPT_FINGERPRINT = make_cache_key(PROMPT_VERSION, _EXTRACTION_PROMPT_HEADER, _EXTRACTION_PROMPT_FOOTER)
+
+# Generation settings are invariant across calls, so build them once
+_JSON_RESPONSE_CONFIG = {"response_mime_type": "application/json"}
+_EXTRACTION_GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "max_output_tokens": 8192,
+    "use_grounding": False,
+    "extra_config": _JSON_RESPONSE_CONFIG,
+}
+
+_TRAILING_COMMA_RE = re.compile(r',\s*([\]}])')
+_LINE_COMMENT_RE = re.compile(r'//.*')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _iter_sentences(text: str, min_length: int = 20):
+    """Lazily yield stripped '.'-separated sentences longer than min_length."""
+    start = 0
+    while start <= len(text):
+        end = text.find('.', start)
+        if end == -1:
+            end = len(text)
+        sentence = text[start:end].strip()
+        if len(sentence) > min_length:
+            yield sentence
+        start = end + 1
+
 
 class ExtractionAgent:
     """Agent for extracting factual claims from text."""
     
     def __init__(self):
         self.vertex_client = vertex_client
+        self.cache = extraction_cache
     
-    async def extract_claims(self, text: str, session_id: str = "default", progress_callback: Optional[Callable] = None) -> List[Dict[str, Any]]:
+    async def extract_claims(
+        self,
+        text: str,
+        session_id: str = "default",
+        progress_callback: Optional[Callable] = None,
+        on_claim: Optional[Callable] = None
+    ) -> List[Dict[str, Any]]:
         """
         Extract verifiable factual claims from text.
+        
+        on_claim, if given, is awaited with each claim as soon as the model
+        finishes streaming it (before the full response is validated).
         """
         logger.info(f"Extracting claims from text ({len(text)} chars)")
         
+        # Too short to be an article - don't spend an LLM call on it
+        if not text or len(text.strip()) < settings.min_extraction_chars:
+            logger.info("Text below minimum extraction length, skipping LLM call")
+            return []
+        
+        cache_key = make_cache_key(_PROMPT_FINGERPRINT, self.vertex_client.model_name, text)
+        cached_claims = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached_claims is not None:
+            logger.info(f"Extraction cache hit ({len(cached_claims)} claims)")
+            return self._validate_claims(cached_claims, text)
+        
         # Initialize Thinking Refiner for professional updates
         refiner = None
         if progress_callback:
@@ -35,55 +119,47 @@ class ExtractionAgent:
                 progress_callback=progress_callback
             )
         
-        prompt = f"""You are a professional fact-checker. Analyze the following article and extract EVERY individual verifiable factual claim.
-
-Typical articles contain 5-15 distinct claims. Extract each one separately.
-
-Article text:
-\"\"\"
-{text}
-\"\"\"
-
-Return your response AS ONLY A VALID JSON ARRAY. 
-Each object in the array MUST have this structure:
-{{
-    "claim": "The specific factual statement",
-    "verbatim": "The EXACT line or sentence from the article (must be verbatim)",
-    "context": "Surrounding context from the original text",
-    "type": "statistical|historical|scientific|attribution|general",
-    "is_quote": true|false,
-    "confidence": 0.0-1.0
-}}
-
-IMPORTANT: 
-- The "verbatim" field MUST BE AN EXACT SUBSTRTING from the article.
-- Return ONLY the JSON array. Don't add text before or after.
-"""
+        prompt = _EXTRACTION_PROMPT_HEADER + text + _EXTRACTION_PROMPT_FOOTER
 
         try:
             full_text = ""
             all_thoughts = ""
-            max_tokens = 8192
-            
             chunk_count = 0
+            # Emit claims to the client as soon as each JSON object closes
+            streamer = JsonArrayStreamer()
+            streamed_count = 0
             async for chunk in self.vertex_client.generate_streaming(
                 prompt=prompt,
-                temperature=0.1,
-                max_output_tokens=max_tokens,
-                use_grounding=False,
-                extra_config={"response_mime_type": "application/json"}
+                **_EXTRACTION_GENERATION_CONFIG
             ):
                 chunk_count += 1
-                if chunk['type'] == 'thought':
-                    logger.debug(f"Extraction chunk {chunk_count}: Received thought ({len(chunk['text'])} chars)")
-                    all_thoughts += chunk['text']
+                thought = chunk['thought']
+                if thought:
+                    logger.debug(f"Extraction chunk {chunk_count}: Received thought ({len(thought)} chars)")
+                    all_thoughts += thought
                     # Route thoughts through refiner if available
                     if refiner:
-                        await refiner.add_raw_thought(chunk['text'])
+                        await refiner.add_raw_thought(thought)
                     
-                if chunk['type'] == 'text':
-                    logger.debug(f"Extraction chunk {chunk_count}: Received text content ({len(chunk['text'])} chars)")
-                    full_text += chunk['text']
+                text_chunk = chunk['text']
+                if text_chunk:
+                    logger.debug(f"Extraction chunk {chunk_count}: Received text content ({len(text_chunk)} chars)")
+                    full_text += text_chunk
+                    if progress_callback or on_claim:
+                        for streamed_claim in streamer.feed(text_chunk):
+                            if not isinstance(streamed_claim, dict):
+                                continue
+                            streamed_count += 1
+                            streamed_claim["id"] = f"claim_{streamed_count}"
+                            if on_claim:
+                                await on_claim(streamed_claim)
+                            if progress_callback:
+                                # The claim itself goes out once, via on_claim; this is just progress
+                                await progress_callback({
+                                    "claim_id": "extraction_thinking",
+                                    "phase": "CLAIM_READY",
+                                    "message": f"Identified claim {streamed_count}"
+                                })
             
             logger.info(f"Extraction streaming loop finished after {chunk_count} chunks. full_text_len={len(full_text)}")
             
@@ -98,9 +174,15 @@ IMPORTANT:
                 logger.warning("Empty text response, but found thoughts. Searching thoughts for JSON.")
                 combined_search_area = all_thoughts.strip()
             
-            # Find JSON boundaries
-            start_idx = combined_search_area.find('[')
-            end_idx = combined_search_area.rfind(']')
+            # Find JSON boundaries (well-formed responses start/end with the brackets)
+            if combined_search_area.startswith('['):
+                start_idx = 0
+            else:
+                start_idx = combined_search_area.find('[')
+            if combined_search_area.endswith(']'):
+                end_idx = len(combined_search_area) - 1
+            else:
+                end_idx = combined_search_area.rfind(']')
             
             if start_idx != -1 and end_idx != -1:
                 json_text = combined_search_area[start_idx:end_idx + 1]
@@ -108,35 +190,29 @@ IMPORTANT:
                 json_text = combined_search_area
             
             try:
-                claims = json.loads(json_text)
-            except json.JSONDecodeError:
+                claims = orjson.loads(json_text)
+            except orjson.JSONDecodeError:
                 # Cleanup attempt
-                cleaned = re.sub(r',\s*([\]}])', r'\1', json_text)
-                cleaned = re.sub(r'//.*', '', cleaned) # Remove comments if any
-                claims = json.loads(cleaned)
+                cleaned = _TRAILING_COMMA_RE.sub(r'\1', json_text)
+                cleaned = _LINE_COMMENT_RE.sub('', cleaned) # Remove comments if any
+                claims = orjson.loads(cleaned)
             
             if not isinstance(claims, list):
                 raise ValueError(f"Extracted JSON is not a list: {type(claims)}")
             
-            # Ensure each claim has required fields
-            for i, claim in enumerate(claims):
-                claim["id"] = f"claim_{i+1}"
-                if "verbatim" not in claim:
-                    claim["verbatim"] = claim.get("claim", "")
-                # Ensure verbatim is actually in the text (basic check)
-                if claim["verbatim"] not in text:
-                    # Attempt simple fix: check if it's a whitespace issue
-                    trimmed = claim["verbatim"].strip()
-                    if trimmed in text:
-                        claim["verbatim"] = trimmed
+            claims = self._validate_claims(claims, text)
+            await asyncio.to_thread(self.cache.set, cache_key, claims)
             
-            logger.info(f"Successfully extracted {len(claims)} claims:")
-            for i, claim in enumerate(claims):
-                logger.info(f"  Claim {i+1}: {claim.get('claim')}")
-                logger.info(f"  Verbatim: {claim.get('verbatim')}")
+            if logger.isEnabledFor(logging.INFO):
+                summary = "\n".join(
+                    f"  Claim {i+1}: {claim.get('claim')}\n  Verbatim: {claim.get('verbatim')}"
+                    for i, claim in enumerate(claims)
+                )
+                logger.info("Successfully extracted %d claims:\n%s", len(claims), summary)
             
             # Also log full JSON for deep cross-checking
-            logger.debug(f"Full Extracted Claims JSON: {json.dumps(claims, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Full Extracted Claims JSON: %s", orjson.dumps(claims, option=orjson.OPT_INDENT_2).decode())
             return claims
             
         except Exception as e:
@@ -145,9 +221,9 @@ IMPORTANT:
             logger.error(f"Thoughts Response Head: {all_thoughts[:200]}")
             
             # Smart fallback: split by sentences and take first 3 as separate potential claims
-            sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 20]
+            sentences = list(islice(_iter_sentences(text), 3))
             fallback_claims = []
-            for i in range(min(3, len(sentences))):
+            for i in range(len(sentences)):
                 fallback_claims.append({
                     "id": f"claim_fb_{i+1}",
                     "claim": sentences[i] + ".",
@@ -167,21 +243,56 @@ IMPORTANT:
                 "is_quote": False,
                 "confidence": 0.3
             }]
+        finally:
+            # No-op after a successful flush; otherwise stops the refiner's consumer task
+            if refiner:
+                await refiner.close()
+    
+    def _validate_claims(self, claims: List[Dict[str, Any]], text: str) -> List[Dict[str, Any]]:
+        """Ensure each claim has required fields and a verbatim span from the text."""
+        text_norm = None
+        # Each distinct span is resolved at most once; the LLM often repeats verbatims
+        resolved: Dict[str, str] = {}
+        
+        for i, claim in enumerate(claims):
+            claim["id"] = f"claim_{i+1}"
+            if "verbatim" not in claim:
+                claim["verbatim"] = claim.get("claim", "")
+            verbatim = claim["verbatim"]
+            if verbatim in resolved:
+                claim["verbatim"] = resolved[verbatim]
+                continue
+            resolved[verbatim] = verbatim
+            # Ensure verbatim is actually in the text (basic check)
+            if verbatim in text:
+                continue
+            
+            # Whitespace may differ (trimmed ends, newlines or double spaces inside).
+            # Normalize the article once, then recover the exact original span.
+            if text_norm is None:
+                text_norm = _WHITESPACE_RE.sub(' ', text)
+            verbatim_norm = _WHITESPACE_RE.sub(' ', verbatim).strip()
+            if verbatim_norm and verbatim_norm in text_norm:
+                span_re = r'\s+'.join(re.escape(word) for word in verbatim_norm.split(' '))
+                match = re.search(span_re, text)
+                if match:
+                    claim["verbatim"] = resolved[verbatim] = match.group(0)
+        return claims
     
     async def refine_claims(self, claims: List[Dict], user_feedback: str) -> List[Dict[str, Any]]:
         # Same as before but with JSON mode
-        prompt = f"Update these claims based on feedback: {user_feedback}\n\nClaims: {json.dumps(claims)}"
+        prompt = f"Update these claims based on feedback: {user_feedback}\n\nClaims: {orjson.dumps(claims).decode()}"
         try:
             resp = await self.vertex_client.generate_with_grounding(
                 prompt=prompt,
-                extra_config={"response_mime_type": "application/json"}
+                extra_config=_JSON_RESPONSE_CONFIG
             )
             text_resp = resp["text"].strip()
             s = text_resp.find('[')
             e = text_resp.rfind(']')
             if s != -1 and e != -1:
-                return json.loads(text_resp[s:e+1])
-            return json.loads(text_resp)
+                return orjson.loads(text_resp[s:e+1])
+            return orjson.loads(text_resp)
         except:
             return claims
 
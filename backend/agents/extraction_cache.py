@@ -0,0 +1,116 @@
+"""
+Content-addressable cache for extracted claims.
+Stores one JSON file per key so repeated articles skip the LLM entirely.
+Entries expire after a TTL and the oldest are evicted beyond a maximum count.
+The methods do blocking file I/O; async callers run them with asyncio.to_thread.
+"""
+import logging
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts: str) -> str:
+    """
+    Build a SHA-256 key from the given parts.
+    Each part is length-prefixed (8 bytes, big-endian) so that different
+    splits of the same bytes can never collide.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """JSON-per-key directory cache for extraction results."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else settings.extraction_cache_path
+        self.enabled = settings.llm_cache_enabled if enabled is None else enabled
+        self.ttl_seconds = settings.extraction_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.extraction_cache_max_entries if max_entries is None else max_entries
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached claims for key, or None on miss."""
+        if not self.enabled:
+            return None
+
+        path = self._path_for(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                claims = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable extraction cache entry {key}: {e}")
+            return None
+
+        if not isinstance(claims, list):
+            logger.warning(f"Ignoring malformed extraction cache entry {key}")
+            return None
+        return claims
+
+    def set(self, key: str, claims: List[Dict[str, Any]]):
+        """Store claims under key. Failures are logged, never raised."""
+        if not self.enabled:
+            return
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename so readers never see partial JSON
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(claims, f)
+                os.replace(tmp_path, self._path_for(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to write extraction cache entry {key}: {e}")
+
+    def _evict(self):
+        """Delete expired entries, then the oldest ones beyond max_entries."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    entries.append((entry.stat().st_mtime, entry.path))
+        entries.sort()
+        cutoff = time.time() - self.ttl_seconds
+        excess = len(entries) - self.max_entries
+        for i, (mtime, path) in enumerate(entries):
+            if i >= excess and mtime >= cutoff:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+# Global extraction cache instance
+extraction_cache = ExtractionCache()
@@ -0,0 +1,217 @@
+"""
+Semantic cache for claim verification results.
+Embeds claim text and reuses verdicts for near-duplicate (paraphrased) claims.
+"""
+import logging
+import asyncio
+import json
+import re
+import time
+import copy
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from config import settings
+
+# Heavy optional dependencies (numpy, faiss-cpu, sentence-transformers) are imported
+# by SemanticCache._initialize, which only the app lifespan triggers
+np = None
+faiss = None
+
+logger = logging.getLogger(__name__)
+
+# Embeddings barely separate "fell to 3.9%" from "rose to 4.9%" or "is" from "is not",
+# so hits must also agree exactly on numbers and negations
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)*')
+_WORD_RE = re.compile(r"[a-z]+n't|[a-z]+")
+_NEGATIONS = frozenset({
+    "not", "no", "never", "none", "nor", "neither", "nobody", "nothing", "nowhere",
+    "without", "cannot", "isn't", "aren't", "wasn't", "weren't", "don't", "doesn't",
+    "didn't", "won't", "wouldn't", "can't", "couldn't", "shouldn't", "hasn't", "haven't", "hadn't",
+})
+
+
+def cache_text(claim_text: str, context: Optional[str] = None) -> str:
+    """Text a verdict is keyed on: the claim plus the context it was verified in."""
+    if context:
+        return f"{claim_text}\n\nContext: {context}"
+    return claim_text
+
+
+def _exact_tokens(text: str) -> List[str]:
+    """Numbers and negation words in text, in order; a cache hit must match these exactly."""
+    lowered = text.lower().replace("\u2019", "'")
+    numbers = _NUMBER_RE.findall(lowered)
+    negations = [word for word in _WORD_RE.findall(lowered) if word in _NEGATIONS]
+    return numbers + negations
+
+
+@dataclass
+class CacheConfig:
+    """Tuning knobs for the semantic cache."""
+    similarity_threshold: float = 0.92
+    ttl: int = 3600
+    model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    search_k: int = 4
+
+
+class SemanticCache:
+    """Nearest-neighbour cache of verification results keyed by claim embedding."""
+
+    INDEX_FILE = "index.faiss"
+    ENTRIES_FILE = "entries.json"
+
+    def __init__(self, config: Optional[CacheConfig] = None, cache_dir: Optional[Path] = None):
+        self.config = config or CacheConfig(
+            similarity_threshold=settings.semantic_cache_threshold,
+            ttl=settings.semantic_cache_ttl_seconds,
+            model_name=settings.semantic_cache_model,
+        )
+        self.cache_dir = cache_dir or settings.semantic_cache_path
+        self.enabled = settings.llm_cache_enabled and settings.semantic_cache_enabled
+        self.initialized = False
+        self.model = None
+        self.index = None
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._unsaved = 0
+        self._init_lock = threading.Lock()
+
+    def initialize(self):
+        """Load the embedding model and any persisted index. Safe to call repeatedly."""
+        with self._init_lock:
+            self._initialize()
+
+    def _initialize(self):
+        global np, faiss
+        if self.initialized or not self.enabled:
+            return
+
+        try:
+            import numpy
+            import faiss as faiss_module
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            logger.warning("Semantic cache disabled: faiss-cpu / sentence-transformers not installed")
+            self.enabled = False
+            return
+        np, faiss = numpy, faiss_module
+
+        try:
+            self.model = SentenceTransformer(self.config.model_name)
+            dim = self.model.get_sentence_embedding_dimension()
+            self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+            self._load()
+            self.initialized = True
+            logger.info(f"Semantic cache initialized: model={self.config.model_name}, entries={len(self.entries)}")
+        except Exception as e:
+            logger.error(f"Failed to initialize semantic cache: {e}")
+            self.enabled = False
+
+    def _load(self):
+        index_path = self.cache_dir / self.INDEX_FILE
+        entries_path = self.cache_dir / self.ENTRIES_FILE
+        if not index_path.exists() or not entries_path.exists():
+            return
+
+        try:
+            index = faiss.read_index(str(index_path))
+            entries = json.loads(entries_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable semantic cache on disk: {e}")
+            return
+
+        if index.d != self.index.d:
+            logger.warning("Ignoring semantic cache on disk: embedding dimension changed")
+            return
+
+        self.index = index
+        self.entries = {int(k): v for k, v in entries.items()}
+        self._next_id = max(self.entries, default=-1) + 1
+
+    def persist(self):
+        """Write the index and results to disk (blocking; called at shutdown)."""
+        if not self.initialized or not self._unsaved:
+            return
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(self.index, str(self.cache_dir / self.INDEX_FILE))
+            (self.cache_dir / self.ENTRIES_FILE).write_text(json.dumps(self.entries), encoding="utf-8")
+            self._unsaved = 0
+        except Exception as e:
+            logger.warning(f"Failed to persist semantic cache: {e}")
+
+    async def embed(self, text: str):
+        """Return a normalized embedding for text (see cache_text), or None if the cache is unavailable."""
+        # Not initialized yet (or disabled): verify without the cache rather than load the model here
+        if not self.initialized or not text.strip():
+            return None
+
+        try:
+            vec = await asyncio.to_thread(
+                self.model.encode, [text], normalize_embeddings=True
+            )
+        except Exception as e:
+            logger.warning(f"Claim embedding failed, bypassing semantic cache: {e}")
+            return None
+        return np.asarray(vec, dtype="float32")
+
+    def lookup(self, vec, text: str) -> Optional[Dict]:
+        """
+        Return a copy of the closest fresh cached result above the similarity threshold
+        whose key text has the same numbers and negations as text.
+        """
+        if vec is None or not self.entries:
+            return None
+
+        tokens = _exact_tokens(text)
+
+        scores, ids = self.index.search(vec, self.config.search_k)
+        now = time.time()
+        expired = []
+        hit = None
+        for score, entry_id in zip(scores[0], ids[0]):
+            if entry_id == -1 or score < self.config.similarity_threshold:
+                break
+            entry = self.entries.get(int(entry_id))
+            if entry is None:
+                continue
+            if now - entry["created_at"] > self.config.ttl:
+                expired.append(int(entry_id))
+                continue
+            if entry.get("tokens") != tokens:
+                continue
+            logger.info(f"Semantic cache hit (similarity={score:.3f})")
+            hit = copy.deepcopy(entry["result"])
+            break
+
+        if expired:
+            self.index.remove_ids(np.asarray(expired, dtype="int64"))
+            for entry_id in expired:
+                del self.entries[entry_id]
+            self._unsaved += 1
+
+        return hit
+
+    def add(self, vec, text: str, result: Dict):
+        """Store a verification result under the embedding of text (see cache_text)."""
+        if vec is None:
+            return
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self.index.add_with_ids(vec, np.asarray([entry_id], dtype="int64"))
+        self.entries[entry_id] = {
+            "result": copy.deepcopy(result),
+            "tokens": _exact_tokens(text),
+            "created_at": time.time(),
+        }
+
+        self._unsaved += 1
+
+
+# Global semantic cache instance
+semantic_cache = SemanticCache()
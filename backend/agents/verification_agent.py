@@ -3,19 +3,57 @@ Verification agent using Gemini with Google Search Grounding.
 Implements thinking process streaming and claim verification.
 """
 import logging
-from typing import Dict, Callable, Optional
+from typing import Dict, Callable, Optional, Tuple
 import asyncio
+import re
 
 from utils.vertex_client import vertex_client
+from utils.retry import is_retryable_error
+from agents.semantic_cache import semantic_cache, cache_text
 
 logger = logging.getLogger(__name__)
 
+# Generation settings are invariant across calls, so build them once
+_VERIFICATION_GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "max_output_tokens": 2048,
+    "use_grounding": True,
+}
+# For callers that run their own retry loop: transient errors surface immediately
+_VERIFICATION_SINGLE_ATTEMPT_CONFIG = {**_VERIFICATION_GENERATION_CONFIG, "max_retries": 0}
+
+_FLOAT_RE = re.compile(r'(\d+\.?\d*)')
+_SECTION_RE = re.compile(
+    r'##[ \t]*(Thinking Process|Verification Status|Confidence Score|Evidence Summary|Key Findings)'
+    r'[ \t:]*(.*?)(?=\n[ \t]*##|\Z)',
+    re.S
+)
+# Longer keywords first, so UNVERIFIED / PARTIALLY_VERIFIED aren't read as VERIFIED
+_STATUS_RE = re.compile(r'PARTIALLY[ _]VERIFIED|UNVERIFIED|VERIFIED|DISPUTED|FALSE')
+
+
+def _ordinal_suffix(n: int) -> str:
+    if 11 <= (n % 100) <= 13:
+        return "th"
+    return {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+
+
+# Precomputed ordinals (1st, 2nd, 3rd, 4th...) for the task indices we actually see
+_ORDINALS = tuple(f"{n}{_ordinal_suffix(n)}" for n in range(1000))
+
+
+def _ordinal(n: int) -> str:
+    if 0 <= n < len(_ORDINALS):
+        return _ORDINALS[n]
+    return f"{n}{_ordinal_suffix(n)}"
+
 
 class VerificationAgent:
     """Agent for verifying factual claims with grounding."""
     
     def __init__(self):
         self.vertex_client = vertex_client
+        self.semantic_cache = semantic_cache
     
     async def verify_claim(
         self,
@@ -23,7 +61,9 @@ class VerificationAgent:
         session_id: str,
         progress_callback: Optional[Callable] = None,
         task_index: Optional[int] = None,
-        total_tasks: Optional[int] = None
+        total_tasks: Optional[int] = None,
+        refiner: Optional["ThinkingRefiner"] = None,
+        retry_transient: bool = True
     ) -> Dict:
         """
         Verify a factual claim using Gemini with Google Search grounding.
@@ -32,6 +72,10 @@ class VerificationAgent:
             claim: Claim dictionary with 'claim' text and metadata
             session_id: Session identifier for thinking refinement
             progress_callback: Optional callback for streaming thinking updates
+            refiner: Optional pre-configured refiner for this claim's thinking;
+                it is flushed before the verdict is announced
+            retry_transient: Retry 429/503 errors in the Vertex client. Pass False when
+                the caller retries itself; such errors are then raised without an error frame
         
         Returns:
             Verification result with status, confidence, evidence, and sources
@@ -43,20 +87,34 @@ class VerificationAgent:
         
         logger.info(f"Verifying claim {claim_id}: {claim_text[:100]}...")
         
-        # Initialize thinking refiner
-        refiner = None
-        if progress_callback:
+        # Nothing to verify - answer without calling Vertex
+        if not claim_text.strip():
+            empty_result = self._parse_verification_response("", [])
+            empty_result["confidence"] = 0.0
+            empty_result["evidence_summary"] = "No claim text was provided."
+            empty_result["claim_id"] = claim_id
+            empty_result["claim_text"] = claim_text
+            empty_result["claim_type"] = claim.get("type", "general")
+            
+            if progress_callback:
+                await progress_callback({
+                    "claim_id": claim_id,
+                    "phase": "completed",
+                    "message": f"Verification complete: {empty_result['status']}",
+                    "is_final_thinking": True,
+                    "result": empty_result
+                })
+            return empty_result
+        
+        # Initialize thinking refiner unless the caller supplied one
+        if refiner is None and progress_callback:
             refiner = ThinkingRefiner(session_id, claim_id, progress_callback)
         
         # Send initial status
         if progress_callback:
             message = "Initializing verification parameters..."
             if task_index is not None:
-                # Determine ordinal suffix (1st, 2nd, 3rd, 4th...)
-                suffix = "th"
-                if not 11 <= (task_index % 100) <= 13:
-                    suffix = {1: "st", 2: "nd", 3: "rd"}.get(task_index % 10, "th")
-                message = f"Starting up with the {task_index}{suffix} verification task."
+                message = f"Starting up with the {_ordinal(task_index)} verification task."
                 
             await progress_callback({
                 "claim_id": claim_id,
@@ -64,6 +122,33 @@ class VerificationAgent:
                 "message": message
             })
         
+        # Reuse the verdict of a previously verified paraphrase (in the same context) if available
+        claim_key = cache_text(claim_text, claim.get("context"))
+        claim_vec = await self.semantic_cache.embed(claim_key)
+        cached_result = self.semantic_cache.lookup(claim_vec, claim_key)
+        if cached_result is not None:
+            cached_result["claim_id"] = claim_id
+            cached_result["claim_text"] = claim_text
+            cached_result["claim_type"] = claim.get("type", "general")
+            cached_result["from_cache"] = True
+            
+            if progress_callback:
+                await progress_callback({
+                    "claim_id": claim_id,
+                    "phase": "VALIDATING",
+                    "message": "Found a matching verified claim in cache. Reusing its verdict."
+                })
+                await progress_callback({
+                    "claim_id": claim_id,
+                    "phase": "completed",
+                    "message": f"Verification complete: {cached_result['status']}",
+                    "is_final_thinking": True,
+                    "result": cached_result
+                })
+            
+            logger.info(f"Claim {claim_id} served from semantic cache: {cached_result['status']}")
+            return cached_result
+        
         prompt = f"""You are a professional fact-checker. Verify the following claim using real-time information from Google Search.
 
 Claim to verify:
@@ -120,12 +205,10 @@ Format your response as follows:
             # Generate verification with streaming for real-time thinking
             async for chunk in self.vertex_client.generate_streaming(
                 prompt=prompt,
-                temperature=0.1,
-                max_output_tokens=2048,
-                use_grounding=True
+                **(_VERIFICATION_GENERATION_CONFIG if retry_transient else _VERIFICATION_SINGLE_ATTEMPT_CONFIG)
             ):
-                if chunk["type"] == "thought":
-                    thought_text = chunk["text"]
+                thought_text = chunk["thought"]
+                if thought_text:
                     full_thought += thought_text
                     
                     # Pass raw thought to refiner for real-time polishing
@@ -139,12 +222,11 @@ Format your response as follows:
                             "message": thought_text,
                             "is_native_thought": True
                         })
-                elif chunk["type"] == "citations":
-                    all_citations.extend(chunk["data"])
-                else:
-                    full_text += chunk["text"]
+                if chunk["citations"]:
+                    all_citations.extend(chunk["citations"])
+                full_text += chunk["text"]
             
-            # Flush refiner to capture last bit of thinking
+            # Flush refiner to capture last bit of thinking (before the verdict goes out)
             if refiner:
                 await refiner.flush()
             
@@ -157,7 +239,7 @@ Format your response as follows:
                 })
             
             # Parse response text
-            verification_result = self._parse_verification_response(
+            verification_result, verdict_found = self._parse_verification_sections(
                 full_text,
                 all_citations
             )
@@ -171,6 +253,10 @@ Format your response as follows:
             verification_result["claim_text"] = claim_text
             verification_result["claim_type"] = claim.get("type", "general")
             
+            # Don't reuse the UNVERIFIED/0.5 default of an empty or truncated response
+            if verdict_found:
+                self.semantic_cache.add(claim_vec, claim_key, verification_result)
+            
             # Send completion update
             if progress_callback:
                 await progress_callback({
@@ -187,8 +273,8 @@ Format your response as follows:
         except Exception as e:
             logger.error(f"Error verifying claim {claim_id}: {e}")
             
-            # Send error update
-            if progress_callback:
+            # Send error update (unless the caller is about to retry this attempt)
+            if progress_callback and (retry_transient or not is_retryable_error(e)):
                 await progress_callback({
                     "claim_id": claim_id,
                     "phase": "error",
@@ -196,9 +282,18 @@ Format your response as follows:
                 })
             
             raise
+        finally:
+            # No-op after a successful flush; otherwise stops the refiner's consumer task
+            if refiner:
+                await refiner.close()
     
     def _parse_verification_response(self, response_text: str, citations: list) -> Dict:
         """Parse the verification response into structured data."""
+        return self._parse_verification_sections(response_text, citations)[0]
+    
+    def _parse_verification_sections(self, response_text: str, citations: list) -> Tuple[Dict, bool]:
+        """Parse the verification response; the flag tells whether it contained a verdict."""
+        verdict_found = False
         result = {
             "thinking_process": "",
             "status": "UNVERIFIED",
@@ -210,46 +305,41 @@ Format your response as follows:
         }
         
         try:
-            # Extract sections
-            sections = response_text.split("##")
-            
-            for section in sections:
-                section = section.strip()
+            # Extract sections in a single pass; the header is consumed by the match
+            for match in _SECTION_RE.finditer(response_text):
+                header = match.group(1)
+                body = match.group(2).strip()
                 
-                if section.startswith("Thinking Process"):
-                    result["thinking_process"] = section.replace("Thinking Process", "").strip()
+                if header == "Thinking Process":
+                    result["thinking_process"] = body
                 
-                elif section.startswith("Verification Status"):
-                    status_text = section.replace("Verification Status", "").strip()
+                elif header == "Verification Status":
                     # Extract status keyword
-                    for status in ["VERIFIED", "PARTIALLY_VERIFIED", "UNVERIFIED", "DISPUTED", "FALSE"]:
-                        if status in status_text.upper():
-                            result["status"] = status
-                            break
+                    status = _STATUS_RE.search(body.upper())
+                    if status:
+                        result["status"] = status.group(0).replace(" ", "_")
+                        verdict_found = True
                 
-                elif section.startswith("Confidence Score"):
-                    confidence_text = section.replace("Confidence Score", "").strip()
+                elif header == "Confidence Score":
                     try:
                         # Extract first number found
-                        import re
-                        match = re.search(r'(\d+\.?\d*)', confidence_text)
-                        if match:
-                            result["confidence"] = float(match.group(1))
+                        number = _FLOAT_RE.search(body)
+                        if number:
+                            result["confidence"] = float(number.group(1))
                             # Ensure it's between 0 and 1
                             if result["confidence"] > 1:
                                 result["confidence"] = result["confidence"] / 100
                     except:
                         pass
                 
-                elif section.startswith("Evidence Summary"):
-                    result["evidence_summary"] = section.replace("Evidence Summary", "").strip()
+                elif header == "Evidence Summary":
+                    result["evidence_summary"] = body
                 
-                elif section.startswith("Key Findings"):
-                    findings_text = section.replace("Key Findings", "").strip()
+                elif header == "Key Findings":
                     # Extract bullet points
                     findings = [
                         line.strip().lstrip("-•*").strip()
-                        for line in findings_text.split("\n")
+                        for line in body.split("\n")
                         if line.strip() and line.strip().startswith(("-", "•", "*"))
                     ]
                     result["key_findings"] = findings
@@ -257,7 +347,7 @@ Format your response as follows:
         except Exception as e:
             logger.error(f"Error parsing verification response: {e}")
         
-        return result
+        return result, verdict_found
 
 
 # Global verification agent instance
@@ -17,6 +17,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Read uploads 1 MiB at a time
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 
 # Request/Response Models
 class VerifySingleRequest(BaseModel):
@@ -54,8 +57,8 @@ class SessionResponse(BaseModel):
 async def create_session():
     """Create a new verification session."""
     try:
-        session_id = session_manager.create_session()
-        session = session_manager.get_session(session_id)
+        session_id = await session_manager.create_session()
+        session = await session_manager.get_session(session_id)
         
         return {
             "session_id": session_id,
@@ -78,7 +81,7 @@ async def verify_single_claim(request: VerifySingleRequest):
     """
     try:
         # Create or recover session
-        session_id = session_manager.create_session(request.session_id)
+        session_id = await session_manager.create_session(request.session_id)
         
         # Verify claim
         result = await orchestration_service.verify_single_claim(
@@ -105,7 +108,7 @@ async def analyze_text(request: AnalyzeTextRequest):
     """
     try:
         # Create or recover session
-        session_id = session_manager.create_session(request.session_id)
+        session_id = await session_manager.create_session(request.session_id)
         
         # Extract claims
         result = await orchestration_service.process_text_extraction(
@@ -132,7 +135,7 @@ async def confirm_claims(request: ConfirmClaimsRequest):
     """
     try:
         # Get session
-        session = session_manager.get_session(request.session_id)
+        session = await session_manager.get_session(request.session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -155,7 +158,7 @@ async def confirm_claims(request: ConfirmClaimsRequest):
 async def get_session(session_id: str):
     """Get session information and status."""
     try:
-        session = session_manager.get_session(session_id)
+        session = await session_manager.get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -175,7 +178,7 @@ async def list_sessions():
         # Clean up expired sessions first
         session_manager.cleanup_expired_sessions()
         
-        sessions = session_manager.get_all_sessions()
+        sessions = await session_manager.get_all_sessions()
         return {
             "sessions": sessions,
             "total": len(sessions)
@@ -190,11 +193,11 @@ async def list_sessions():
 async def delete_session(session_id: str):
     """Delete a session."""
     try:
-        session = session_manager.get_session(session_id)
+        session = await session_manager.get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        session_manager.delete_session(session_id)
+        await session_manager.delete_session(session_id)
         
         return {
             "message": "Session deleted successfully",
@@ -224,14 +227,14 @@ async def upload_pdf(
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
         # Create or recover session
-        session_id = session_manager.create_session(session_id)
-        session = session_manager.get_session(session_id) # Guaranteed to exist now
+        session_id = await session_manager.create_session(session_id)
+        session = await session_manager.get_session(session_id) # Guaranteed to exist now
         
-        # Save uploaded file temporarily
+        # Stream the upload to a temp file in chunks rather than buffering it in memory
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
             temp_path = Path(temp_file.name)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                temp_file.write(chunk)
         
         try:
             # Extract text
@@ -246,6 +249,7 @@ async def upload_pdf(
             # Store in session
             session.text = extracted_text
             session.metadata["pdf_filename"] = file.filename
+            await session_manager.save_session(session)
             
             return {
                 "session_id": session_id,
@@ -3,9 +3,10 @@ Configuration management for the fact-checker application.
 Loads settings from environment variables with validation.
 """
 import os
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import List
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 
@@ -14,60 +15,107 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 ENV_FILE = BASE_DIR / ".env"
 
 
+@lru_cache(maxsize=1)
+def _gcp_setup_valid(project_id: str, credentials_path: str) -> bool:
+    """Check GCP setup once per (project, credentials) pair."""
+    if not project_id or project_id == "your-project-id-here":
+        return False
+    
+    # Local key file exists
+    if Path(credentials_path).exists():
+        return True
+        
+    # Fallback: Check if running in Cloud Run (K_SERVICE is set by Cloud Run)
+    if os.environ.get("K_SERVICE"):
+        return True
+        
+    return False
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
     # GCP Configuration
-    gcp_project_id: str = Field(default="", env="GCP_PROJECT_ID")
-    gcp_location: str = Field(default="global", env="GCP_LOCATION")
+    gcp_project_id: str = Field(default="", validation_alias="GCP_PROJECT_ID")
+    gcp_location: str = Field(default="global", validation_alias="GCP_LOCATION")
     google_application_credentials: str = Field(
         default=str(BASE_DIR / "key" / "service-account-key.json"),
-        env="GOOGLE_APPLICATION_CREDENTIALS"
+        validation_alias="GOOGLE_APPLICATION_CREDENTIALS"
     )
     
     # Vertex AI Configuration
     gemini_model: str = Field(
         default="gemini-2.0-flash-thinking-exp-01-21",
-        env="GEMINI_MODEL"
+        validation_alias="GEMINI_MODEL"
     )
     gemini_fast_model: str = Field(
         default="gemini-1.5-flash",
-        env="GEMINI_FAST_MODEL"
+        validation_alias="GEMINI_FAST_MODEL"
     )
-    gemini_temperature: float = Field(default=0.1, env="GEMINI_TEMPERATURE")
-    gemini_max_output_tokens: int = Field(default=2048, env="GEMINI_MAX_OUTPUT_TOKENS")
-    thinking_level: str = Field(default="HIGH", env="THINKING_LEVEL")
-    include_thoughts: bool = Field(default=True, env="INCLUDE_THOUGHTS")
+    gemini_temperature: float = Field(default=0.1, validation_alias="GEMINI_TEMPERATURE")
+    gemini_max_output_tokens: int = Field(default=2048, validation_alias="GEMINI_MAX_OUTPUT_TOKENS")
+    thinking_level: str = Field(default="HIGH", validation_alias="THINKING_LEVEL")
+    include_thoughts: bool = Field(default=True, validation_alias="INCLUDE_THOUGHTS")
     
     # OpenAI Configuration (for fast refinement)
-    openai_api_key: str = Field(default="", env="OPENAI_API_KEY")
-    openai_refiner_model: str = Field(default="gpt-4o-mini", env="OPENAI_REFINER_MODEL")
+    openai_api_key: str = Field(default="", validation_alias="OPENAI_API_KEY")
+    openai_refiner_model: str = Field(default="gpt-4o-mini", validation_alias="OPENAI_REFINER_MODEL")
+    refiner_max_concurrency: int = Field(default=8, validation_alias="REFINER_MAX_CONCURRENCY")
     
     # API Configuration
-    api_host: str = Field(default="0.0.0.0", env="API_HOST")
-    api_port: int = Field(default=8000, env="API_PORT")
-    websocket_port: int = Field(default=8001, env="WEBSOCKET_PORT")
+    api_host: str = Field(default="0.0.0.0", validation_alias="API_HOST")
+    api_port: int = Field(default=8000, validation_alias="API_PORT")
+    websocket_port: int = Field(default=8001, validation_alias="WEBSOCKET_PORT")
     
     # CORS Configuration
     cors_origins: str = Field(
         default="http://localhost:3000,http://localhost:5173",
-        env="CORS_ORIGINS"
+        validation_alias="CORS_ORIGINS"
     )
     
+    # Extraction Configuration
+    min_extraction_chars: int = Field(default=50, validation_alias="MIN_EXTRACTION_CHARS")
+    
+    # Verification Configuration
+    verify_concurrency: int = Field(default=3, validation_alias="VERIFY_CONCURRENCY")
+    verify_max_retries: int = Field(default=3, validation_alias="VERIFY_MAX_RETRIES")
+    verify_retry_base_delay: float = Field(default=2.0, validation_alias="VERIFY_RETRY_BASE_DELAY")
+    
     # Session Configuration
-    session_timeout_minutes: int = Field(default=30, env="SESSION_TIMEOUT_MINUTES")
+    session_timeout_minutes: int = Field(default=30, validation_alias="SESSION_TIMEOUT_MINUTES")
+    session_backend: str = Field(default="memory", validation_alias="SESSION_BACKEND")  # memory, redis
     
     # Redis Configuration (optional)
-    redis_host: str = Field(default="localhost", env="REDIS_HOST")
-    redis_port: int = Field(default=6379, env="REDIS_PORT")
-    redis_db: int = Field(default=0, env="REDIS_DB")
-    
-    @property
+    redis_host: str = Field(default="localhost", validation_alias="REDIS_HOST")
+    redis_port: int = Field(default=6379, validation_alias="REDIS_PORT")
+    redis_db: int = Field(default=0, validation_alias="REDIS_DB")
+
+    # LLM Cache Configuration
+    llm_cache_enabled: bool = Field(default=True, validation_alias="LLM_CACHE_ENABLED")
+    extraction_cache_dir: str = Field(
+        default=str(BASE_DIR / "data" / "extraction_cache"),
+        validation_alias="EXTRACTION_CACHE_DIR"
+    )
+    extraction_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, validation_alias="EXTRACTION_CACHE_TTL_SECONDS")
+    extraction_cache_max_entries: int = Field(default=1000, validation_alias="EXTRACTION_CACHE_MAX_ENTRIES")
+    semantic_cache_enabled: bool = Field(default=False, validation_alias="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_model: str = Field(
+        default="sentence-transformers/all-MiniLM-L6-v2",
+        validation_alias="SEMANTIC_CACHE_MODEL"
+    )
+    semantic_cache_threshold: float = Field(default=0.92, validation_alias="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_ttl_seconds: int = Field(default=3600, validation_alias="SEMANTIC_CACHE_TTL_SECONDS")
+    semantic_cache_dir: str = Field(
+        default=str(BASE_DIR / "data" / "semantic_cache"),
+        validation_alias="SEMANTIC_CACHE_DIR"
+    )
+
+    @cached_property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins from comma-separated string."""
         return [origin.strip() for origin in self.cors_origins.split(",")]
     
-    @property
+    @cached_property
     def credentials_path(self) -> Path:
         """Get absolute path to GCP credentials file."""
         path = Path(self.google_application_credentials)
@@ -75,26 +123,33 @@ class Settings(BaseSettings):
             # If relative, assume it's relative to the project root
             return (BASE_DIR / path).resolve()
         return path.resolve()
-    
+
+    @cached_property
+    def extraction_cache_path(self) -> Path:
+        """Get absolute path to the extraction cache directory."""
+        path = Path(self.extraction_cache_dir)
+        if not path.is_absolute():
+            return (BASE_DIR / path).resolve()
+        return path.resolve()
+
+    @cached_property
+    def semantic_cache_path(self) -> Path:
+        """Get absolute path to the semantic cache directory."""
+        path = Path(self.semantic_cache_dir)
+        if not path.is_absolute():
+            return (BASE_DIR / path).resolve()
+        return path.resolve()
+
     def validate_gcp_setup(self) -> bool:
         """Check if GCP credentials are properly configured."""
-        if not self.gcp_project_id or self.gcp_project_id == "your-project-id-here":
-            return False
-        
-        # Local key file exists
-        if self.credentials_path.exists():
-            return True
-            
-        # Fallback: Check if running in Cloud Run (K_SERVICE is set by Cloud Run)
-        if os.environ.get("K_SERVICE"):
-            return True
-            
-        return False
+        return _gcp_setup_valid(self.gcp_project_id, str(self.credentials_path))
     
-    class Config:
-        env_file = str(ENV_FILE)
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    model_config = SettingsConfigDict(
+        env_file=str(ENV_FILE),
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        frozen=True,
+    )
 
 
 # Global settings instance
@@ -5,23 +5,62 @@ Coordinates claim extraction, user confirmation, and verification.
 import logging
 from typing import List, Dict, Optional
 import asyncio
+import copy
+import math
+import re
+from collections import Counter
+from functools import cached_property, partial
+from itertools import islice
 
-from agents.extraction_agent import extraction_agent
-from agents.verification_agent import verification_agent
+from config import settings
 from core.session_manager import session_manager
+from utils.retry import is_retryable_error, next_retry_delay
 from websocket_app.websocket_handler import connection_manager
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'\S+')
+
+# Longest wait between rate-limited verification attempts
+VERIFY_RETRY_MAX_DELAY = 30.0
+
+
+def _canonical_claim(claim: Dict) -> str:
+    """Normalize claim text so trivially repeated claims compare equal."""
+    return _WHITESPACE_RE.sub(' ', claim.get("claim", "").strip().lower())
+
 
 class OrchestrationService:
     """Main orchestration service for fact-checking workflows."""
     
     def __init__(self):
-        self.extraction_agent = extraction_agent
-        self.verification_agent = verification_agent
         self.session_manager = session_manager
         self.connection_manager = connection_manager
+        self.max_concurrent_verifications = settings.verify_concurrency
+    
+    # Agents are imported on first use so that importing this module (health
+    # checks, cold starts) doesn't load the Vertex AI and OpenAI SDKs
+    @cached_property
+    def extraction_agent(self):
+        from agents.extraction_agent import extraction_agent
+        return extraction_agent
+    
+    @cached_property
+    def verification_agent(self):
+        from agents.verification_agent import verification_agent
+        return verification_agent
+    
+    async def _thinking_cb(self, session_id: str, update: Dict):
+        """Progress callback handed to the agents (bound per session with functools.partial)."""
+        # Nobody is listening (client went away): drop the update before it is serialized
+        if not self.connection_manager.is_connected(session_id):
+            return
+        await self.connection_manager.broadcast_thinking_update(session_id, update)
+    
+    async def _claim_cb(self, session_id: str, claim: Dict):
+        """Forward a claim to the frontend as soon as extraction streams it."""
+        await self.connection_manager.broadcast_claim_extraction(session_id, [claim], partial=True)
     
     async def process_text_extraction(
         self,
@@ -35,22 +74,25 @@ class OrchestrationService:
         logger.info(f"Processing text extraction for session {session_id}")
         
         # Get or create session
-        session = self.session_manager.get_session(session_id)
+        session = await self.session_manager.get_session(session_id)
         if not session:
             logger.error(f"Session not found: {session_id}")
             raise ValueError(f"Invalid session ID: {session_id}")
             
-        # Check word count for chunking
-        words = text.split()
+        # Check word count for chunking; only scan as far as the first word past the limit
         max_words = 750
+        words = _WORD_RE.finditer(text)
+        overflow = next(islice(words, max_words, None), None)
         
         current_chunk_text = text
         remaining_text = ""
         
-        if len(words) > max_words:
-            logger.info(f"Large text detected ({len(words)} words). Slicing first {max_words} words.")
-            current_chunk_text = " ".join(words[:max_words])
-            remaining_text = " ".join(words[max_words:])
+        if overflow is not None:
+            # Slice the original string at the end of the last word that fits
+            current_chunk_text = text[:overflow.start()].rstrip()
+            remaining_text = text[overflow.start():]
+            remaining_words = 1 + sum(1 for _ in words)
+            logger.info(f"Large text detected ({max_words + remaining_words} words). Slicing first {max_words} words.")
             
             # Store remaining text for next sprint
             session.remaining_text = remaining_text
@@ -58,7 +100,7 @@ class OrchestrationService:
             await self.connection_manager.broadcast_status(
                 session_id,
                 "extracting",
-                {"message": f"Processing first {max_words} words. Remaining {len(words) - max_words} words will follow in the next sprint."}
+                {"message": f"Processing first {max_words} words. Remaining {remaining_words} words will follow in the next sprint."}
             )
         else:
             session.remaining_text = ""
@@ -66,6 +108,7 @@ class OrchestrationService:
         # Update session
         session.text = text
         session.status = "extracting"
+        await self.session_manager.save_session(session)
         
         # Notify frontend
         await self.connection_manager.broadcast_status(
@@ -76,21 +119,22 @@ class OrchestrationService:
         
         try:
             # Create progress callback for extraction
-            async def progress_callback(update: Dict):
-                await self.connection_manager.broadcast_thinking_update(session_id, update)
+            progress_callback = partial(self._thinking_cb, session_id)
                 
             # Extract claims from the CURRENT chunk
             claims = await self.extraction_agent.extract_claims(
                 text=current_chunk_text, 
                 session_id=session_id,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                on_claim=partial(self._claim_cb, session_id)
             )
             
             # Store in session
             session.extracted_claims = claims
             session.status = "awaiting_confirmation"
+            await self.session_manager.save_session(session)
             
-            # Send claims to frontend
+            # Send the validated claims; this replaces the partial ones streamed so far
             await self.connection_manager.broadcast_claim_extraction(session_id, claims)
             
             logger.info(f"Extracted {len(claims)} claims for session {session_id}")
@@ -105,6 +149,7 @@ class OrchestrationService:
         except Exception as e:
             logger.error(f"Error in claim extraction: {e}")
             session.status = "error"
+            await self.session_manager.save_session(session)
             await self.connection_manager.broadcast_error(session_id, str(e))
             raise
     
@@ -126,7 +171,7 @@ class OrchestrationService:
         logger.info(f"Initiating background verification for session {session_id} ({len(confirmed_claims)} claims)")
         
         # Get session
-        session = self.session_manager.get_session(session_id)
+        session = await self.session_manager.get_session(session_id)
         if not session:
             raise ValueError(f"Invalid session ID: {session_id}")
         
@@ -134,6 +179,7 @@ class OrchestrationService:
         session.confirmed_claims = confirmed_claims
         session.status = "verifying"
         session.verification_results = [] # Clear previous results
+        await self.session_manager.save_session(session)
         
         # Notify frontend
         await self.connection_manager.broadcast_status(
@@ -157,44 +203,117 @@ class OrchestrationService:
     async def _run_verification_loop(self, session_id: str, confirmed_claims: List[Dict]):
         """Background task to verify claims and stream results."""
         try:
-            session = self.session_manager.get_session(session_id)
+            session = await self.session_manager.get_session(session_id)
             if not session:
                 logger.error(f"Session {session_id} lost during background verification")
                 return
 
             # Progress callback for thinking process
-            async def progress_callback(update: Dict):
-                await self.connection_manager.broadcast_thinking_update(session_id, update)
+            progress_callback = partial(self._thinking_cb, session_id)
             
-            # Process claims sequentially one by one to prevent 429 errors
-            results = []
+            # Articles often repeat a claim; verify each distinct claim once
+            duplicate_groups: Dict[str, List[int]] = {}
             for i, claim in enumerate(confirmed_claims):
-                # Add a small delay between claims to avoid grounding burst limits
-                if i > 0:
-                    logger.info(f"Cooldown delay for 1.5s before claim {i+1}...")
-                    await asyncio.sleep(1.5)
-                try:
-                    logger.info(f"Session {session_id}: Starting verification {i+1}/{len(confirmed_claims)}")
-                    result = await self.verification_agent.verify_claim(
-                        claim, 
-                        session_id, 
-                        progress_callback,
-                        task_index=i+1,
-                        total_tasks=len(confirmed_claims)
-                    )
-                    results.append(result)
-                    
-                    # Update session in-memory list
-                    session.verification_results.append(result)
-                    
-                    # Stream individual result
-                    await self.connection_manager.broadcast_verification_result(session_id, result)
+                duplicate_groups.setdefault(_canonical_claim(claim), []).append(i)
+            
+            # Verify claims concurrently, bounded to respect Vertex QPS limits
+            semaphore = asyncio.Semaphore(self.max_concurrent_verifications)
+            total = len(confirmed_claims)
+            
+            # Each claim streams through its own refiner, which verify_claim flushes
+            # before announcing the verdict (so thinking always precedes the result)
+            from core.thinking_refiner import ThinkingRefiner
+            subscribers_alive = partial(self.connection_manager.is_connected, session_id)
+            
+            async def publish(result: Dict):
+                # Update the session and persist it per verdict, so other workers see
+                # progress and completed verdicts survive a crash (no-op in memory mode)
+                session.verification_results.append(result)
+                await self.session_manager.save_session(session)
+                
+                # Stream individual result
+                await self.connection_manager.broadcast_verification_result(session_id, result)
+            
+            async def verify_one(i: int, claim: Dict, duplicate_indices: List[int]) -> List[Dict]:
+                retries = 0
+                delay = settings.verify_retry_base_delay
+                while True:
+                    try:
+                        async with semaphore:
+                            logger.info(f"Session {session_id}: Starting verification {i+1}/{total}")
+                            result = await self.verification_agent.verify_claim(
+                                claim, 
+                                session_id, 
+                                progress_callback,
+                                task_index=i+1,
+                                total_tasks=total,
+                                refiner=ThinkingRefiner(
+                                    session_id,
+                                    claim.get("id", "unknown"),
+                                    progress_callback,
+                                    subscribers_alive
+                                ),
+                                # This loop is the only retry layer for verification
+                                retry_transient=False
+                            )
+                        break
+                    except Exception as e:
+                        if not is_retryable_error(e):
+                            raise
+                        if retries >= settings.verify_max_retries:
+                            await progress_callback({
+                                "claim_id": claim.get("id", "unknown"),
+                                "phase": "error",
+                                "message": f"Verification failed: {str(e)}"
+                            })
+                            raise
+                        # Back off outside the semaphore so other claims keep their slots.
+                        # The next attempt streams through a fresh refiner.
+                        retries += 1
+                        delay = next_retry_delay(e, delay, settings.verify_retry_base_delay, VERIFY_RETRY_MAX_DELAY)
+                        logger.warning(f"Session {session_id}: Claim {i+1} hit a transient error, retrying in {delay:.2f}s (Attempt {retries}/{settings.verify_max_retries})")
+                        await asyncio.sleep(delay)
+                
+                await publish(result)
+                group_results = [result]
+                
+                # Fan the verdict out to every repeat of this claim
+                for j in duplicate_indices:
+                    duplicate = confirmed_claims[j]
+                    duplicate_result = copy.deepcopy(result)
+                    duplicate_result["claim_id"] = duplicate.get("id", "unknown")
+                    duplicate_result["claim_text"] = duplicate.get("claim", "")
                     
-                except Exception as e:
-                    logger.error(f"Error verifying individual claim {i+1} for session {session_id}: {e}")
+                    await progress_callback({
+                        "claim_id": duplicate_result["claim_id"],
+                        "phase": "completed",
+                        "message": f"Verification complete: {duplicate_result['status']} (same claim as {result['claim_id']})",
+                        "is_final_thinking": True,
+                        "result": duplicate_result
+                    })
+                    await publish(duplicate_result)
+                    group_results.append(duplicate_result)
+                
+                return group_results
+            
+            outcomes = await asyncio.gather(
+                *(
+                    verify_one(indices[0], confirmed_claims[indices[0]], indices[1:])
+                    for indices in duplicate_groups.values()
+                ),
+                return_exceptions=True
+            )
+            
+            results = []
+            for indices, outcome in zip(duplicate_groups.values(), outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Error verifying individual claim {indices[0]+1} for session {session_id}: {outcome}")
+                else:
+                    results.extend(outcome)
             
             # Final session update
             session.status = "completed"
+            await self.session_manager.save_session(session)
             
             # Final summary notification
             summary = self._generate_summary(results)
@@ -232,11 +351,12 @@ class OrchestrationService:
         logger.info(f"Single claim verification for session {session_id}")
         
         # Get session
-        session = self.session_manager.get_session(session_id)
+        session = await self.session_manager.get_session(session_id)
         if not session:
             raise ValueError(f"Invalid session ID: {session_id}")
         
         session.status = "verifying"
+        await self.session_manager.save_session(session)
         
         # Create claim object
         claim = {
@@ -249,8 +369,7 @@ class OrchestrationService:
         }
         
         # Progress callback
-        async def progress_callback(update: Dict):
-            await self.connection_manager.broadcast_thinking_update(session_id, update)
+        progress_callback = partial(self._thinking_cb, session_id)
         
         # Verify claim
         result = await self.verification_agent.verify_claim(claim, session_id, progress_callback)
@@ -260,6 +379,7 @@ class OrchestrationService:
         
         session.verification_results = [result]
         session.status = "completed"
+        await self.session_manager.save_session(session)
         
         return {
             "status": "completed",
@@ -272,18 +392,13 @@ class OrchestrationService:
         if not results:
             return {}
         
-        status_counts = {}
-        total_confidence = 0
-        
-        for result in results:
-            status = result.get("status", "UNVERIFIED")
-            status_counts[status] = status_counts.get(status, 0) + 1
-            total_confidence += result.get("confidence", 0)
+        status_counts = Counter(result.get("status", "UNVERIFIED") for result in results)
+        total_confidence = math.fsum(result.get("confidence", 0) for result in results)
         
         return {
             "total_claims": len(results),
-            "status_breakdown": status_counts,
-            "average_confidence": total_confidence / len(results) if results else 0
+            "status_breakdown": dict(status_counts),
+            "average_confidence": total_confidence / len(results)
         }
 
 
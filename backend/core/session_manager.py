@@ -2,21 +2,31 @@
 Session manager for tracking active verification sessions.
 Maintains session state, user confirmations, and results.
 """
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import List, Optional
+from datetime import datetime, timezone
+import time
 import uuid
 import logging
 
+from core.session_store import create_session_store
+
 logger = logging.getLogger(__name__)
 
 
 class Session:
     """Represents a verification session."""
     
+    __slots__ = (
+        "session_id", "created_at", "last_activity", "text",
+        "extracted_claims", "confirmed_claims", "verification_results",
+        "status", "remaining_text", "metadata",
+    )
+    
     def __init__(self, session_id: str):
         self.session_id = session_id
-        self.created_at = datetime.utcnow()
-        self.last_activity = datetime.utcnow()
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.last_activity = time.monotonic()
         self.text: Optional[str] = None
         self.extracted_claims: List[dict] = []
         self.confirmed_claims: List[dict] = []
@@ -27,19 +37,40 @@ class Session:
     
     def update_activity(self):
         """Update last activity timestamp."""
-        self.last_activity = datetime.utcnow()
+        self.last_activity = time.monotonic()
     
     def is_expired(self, timeout_minutes: int = 30) -> bool:
         """Check if session has expired."""
-        expiry_time = self.last_activity + timedelta(minutes=timeout_minutes)
-        return datetime.utcnow() > expiry_time
+        return time.monotonic() - self.last_activity > timeout_minutes * 60
+    
+    def to_state(self) -> dict:
+        """Snapshot the persistent fields (everything but the monotonic clock)."""
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if name != "last_activity"
+        }
+    
+    @classmethod
+    def from_state(cls, state: dict) -> "Session":
+        """Rebuild a session from a to_state() snapshot."""
+        session = cls(state["session_id"])
+        for name, value in state.items():
+            if name in cls.__slots__ and name != "last_activity":
+                setattr(session, name, value)
+        return session
+    
+    def _last_activity_iso(self) -> str:
+        """Wall-clock ISO timestamp of the last activity (tracked monotonically)."""
+        idle = time.monotonic() - self.last_activity
+        return datetime.fromtimestamp(time.time() - idle, timezone.utc).isoformat()
     
     def to_dict(self) -> dict:
         """Convert session to dictionary."""
         return {
             "session_id": self.session_id,
-            "created_at": self.created_at.isoformat(),
-            "last_activity": self.last_activity.isoformat(),
+            "created_at": self.created_at,
+            "last_activity": self._last_activity_iso(),
             "status": self.status,
             "extracted_claims_count": len(self.extracted_claims),
             "confirmed_claims_count": len(self.confirmed_claims),
@@ -52,51 +83,84 @@ class SessionManager:
     """Manages verification sessions."""
     
     def __init__(self):
-        self.sessions: Dict[str, Session] = {}
+        # In-memory sessions, kept in least-recently-used order so expiry only visits stale ones
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Optional shared store; when set it is the only copy (read through, no local cache)
+        self.store = create_session_store()
     
-    def create_session(self, session_id: Optional[str] = None) -> str:
+    async def create_session(self, session_id: Optional[str] = None) -> str:
         """Create a new session and return its ID."""
         if session_id:
-            if session_id in self.sessions:
+            if await self.get_session(session_id):
                 logger.info(f"Returning existing session: {session_id}")
                 return session_id
             new_id = session_id
         else:
             new_id = str(uuid.uuid4())
-            
-        self.sessions[new_id] = Session(new_id)
+        
+        session = Session(new_id)
+        if self.store is None:
+            self.sessions[new_id] = session
+        else:
+            await self.store.set(new_id, session.to_state())
         logger.info(f"Created/Recovered session: {new_id}")
         return new_id
     
-    def get_session(self, session_id: str) -> Optional[Session]:
+    async def get_session(self, session_id: str) -> Optional[Session]:
         """Get session by ID."""
+        if self.store is not None:
+            # Another worker may have changed it, so always read the stored copy
+            state = await self.store.get(session_id)
+            return Session.from_state(state) if state is not None else None
+        
         session = self.sessions.get(session_id)
         if session:
             session.update_activity()
+            self.sessions.move_to_end(session_id)
         return session
     
-    def delete_session(self, session_id: str):
+    async def save_session(self, session: Session):
+        """Persist the session's current state to the shared store, if one is configured."""
+        if self.store is not None:
+            await self.store.set(session.session_id, session.to_state())
+    
+    async def delete_session(self, session_id: str):
         """Delete a session."""
-        if session_id in self.sessions:
+        if self.store is not None:
+            await self.store.delete(session_id)
+        elif session_id in self.sessions:
             del self.sessions[session_id]
-            logger.info(f"Deleted session: {session_id}")
+        logger.info(f"Deleted session: {session_id}")
     
     def cleanup_expired_sessions(self, timeout_minutes: int = 30):
-        """Remove expired sessions."""
-        expired = [
-            sid for sid, session in self.sessions.items()
-            if session.is_expired(timeout_minutes)
-        ]
-        
-        for session_id in expired:
-            self.delete_session(session_id)
+        """Remove expired in-memory sessions (stored ones expire on their own via the Redis TTL)."""
+        expired = 0
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if not session.is_expired(timeout_minutes):
+                break
+            del self.sessions[session_id]
+            expired += 1
         
         if expired:
-            logger.info(f"Cleaned up {len(expired)} expired sessions")
+            logger.info(f"Cleaned up {expired} expired sessions")
     
-    def get_all_sessions(self) -> List[dict]:
+    async def get_all_sessions(self) -> List[dict]:
         """Get all active sessions."""
-        return [session.to_dict() for session in self.sessions.values()]
+        if self.store is None:
+            return [session.to_dict() for session in self.sessions.values()]
+        
+        sessions = []
+        async for session_id in self.store.scan():
+            state = await self.store.get(session_id)
+            if state is not None:
+                sessions.append(Session.from_state(state).to_dict())
+        return sessions
+    
+    async def close(self):
+        """Close the shared store's connections."""
+        if self.store is not None:
+            await self.store.close()
 
 
 # Global session manager instance
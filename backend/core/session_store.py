@@ -0,0 +1,92 @@
+"""
+Redis-backed persistence for verification sessions.
+Lets sessions survive restarts and be shared between worker processes.
+"""
+import logging
+from typing import Dict, Optional, Any, AsyncIterator
+
+from config import settings
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+    import msgpack
+except ImportError:
+    redis = None
+    aioredis = None
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class RedisSessionStore:
+    """Stores session state as msgpack blobs with a sliding Redis TTL (non-blocking client)."""
+
+    KEY_PREFIX = "fchker:session:"
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or settings.session_timeout_minutes * 60
+        self.client = aioredis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            socket_timeout=2.0,
+            socket_connect_timeout=2.0,
+        )
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.KEY_PREFIX}{session_id}"
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored state for session_id and refresh its TTL, or None."""
+        try:
+            async with self.client.pipeline() as pipe:
+                pipe.get(self._key(session_id))
+                pipe.expire(self._key(session_id), self.ttl_seconds)
+                blob, _ = await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Redis session read failed for {session_id}: {e}")
+            return None
+        if blob is None:
+            return None
+        return msgpack.unpackb(blob, raw=False)
+
+    async def set(self, session_id: str, state: Dict[str, Any]):
+        """Store session state; the key expires after the session timeout."""
+        try:
+            await self.client.set(
+                self._key(session_id),
+                msgpack.packb(state, use_bin_type=True),
+                ex=self.ttl_seconds,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Redis session write failed for {session_id}: {e}")
+
+    async def delete(self, session_id: str):
+        """Remove a stored session."""
+        try:
+            await self.client.delete(self._key(session_id))
+        except redis.RedisError as e:
+            logger.warning(f"Redis session delete failed for {session_id}: {e}")
+
+    async def scan(self) -> AsyncIterator[str]:
+        """Yield the ids of all stored sessions."""
+        try:
+            async for key in self.client.scan_iter(match=f"{self.KEY_PREFIX}*", count=500):
+                yield key.decode()[len(self.KEY_PREFIX):]
+        except redis.RedisError as e:
+            logger.warning(f"Redis session scan failed: {e}")
+
+    async def close(self):
+        """Release the connection pool."""
+        await self.client.aclose()
+
+
+def create_session_store() -> Optional[RedisSessionStore]:
+    """Build the configured session store, or None to keep sessions in process memory."""
+    if settings.session_backend.lower() != "redis":
+        return None
+    if redis is None or msgpack is None:
+        logger.warning("SESSION_BACKEND=redis but redis / msgpack are not installed; using in-memory sessions")
+        return None
+    return RedisSessionStore()
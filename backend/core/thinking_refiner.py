@@ -6,132 +6,383 @@ import logging
 from typing import Dict, Optional, Callable, List
 import json
 import asyncio
+from contextlib import suppress
 
+from config import settings
 from utils.openai_client import openai_client
 
 logger = logging.getLogger(__name__)
 
+# Refined-paragraph deltas are batched into frames of at least this many chars...
+DELTA_EMIT_CHARS = 64
+# ...or sent once this many seconds have passed since the last frame
+DELTA_EMIT_INTERVAL = 0.05
+
+# Without an OpenAI key raw thinking is passed through, at most once per interval
+RAW_EMIT_INTERVAL = 0.1
+
+# Adaptive trigger: while thinking arrives fast enough to reach REFINE_MAX_CHARS
+# within REFINE_BURST_WINDOW seconds, keep batching past buffer_limit; when it
+# would take longer than REFINE_DROUGHT_WAIT to reach buffer_limit, refine early
+REFINE_MAX_CHARS = 2000
+REFINE_BURST_WINDOW = 0.5
+REFINE_DROUGHT_WAIT = 2.0
+# buffer_limit starts at BUFFER_LIMIT_BASE and doubles (up to BUFFER_LIMIT_CEILING)
+# for every consecutive refinement that finished with thinking already queued
+BUFFER_LIMIT_BASE = 1000
+BUFFER_LIMIT_CEILING = 4000
+# Chunks with fewer non-whitespace chars than this (or no letters) skip refinement
+MIN_REFINE_CHARS = 40
+# Smoothing factor for the arrival-rate EMA
+RATE_EMA_ALPHA = 0.2
+# Longest flush() waits for outstanding refinements before sending the rest raw
+FLUSH_TIMEOUT = 10.0
+
+
+def _last_sentence_end(text: str) -> int:
+    """Index just past the last '.', '!' or '?' followed by whitespace, or -1 if there is none."""
+    best = -1
+    for ch in ".!?":
+        i = text.rfind(ch)
+        while i != -1 and (i + 1 >= len(text) or not text[i + 1].isspace()):
+            i = text.rfind(ch, 0, i)
+        best = max(best, i)
+    return best + 2 if best != -1 else -1
+
+
+# Narrative refinement prompt; the raw thinking goes between head and tail
+_REFINE_PROMPT_HEAD = """You are a senior editor and fact-checker analyzing a document.
+Synthesize the following raw thought process into a single, cohesive, professional narrative paragraph.
+
+Guidelines:
+- Output ONLY one logical paragraph.
+- FOCUS STRICTLY on the *intellectual analysis* of the content:
+  * Which specific statements are being isolated for verification?
+  * Why are these claims worth checking? (Subjective/Objective split)
+  * How verifiable does the evidence seem so far?
+- DO NOT mention technical details like JSON, schemas, data fields (is_quote, confidence), or parsing logic.
+- DO NOT mention "formatting" or "structuring the output".
+- Maintain a professional, active voice.
+
+Raw Thinking to Synthesize:
+\"\"\""""
+_REFINE_PROMPT_TAIL = '"""\n'
+
+# Process-wide cap on concurrent OpenAI refinement streams across all claims
+_REFINE_SEM = asyncio.Semaphore(settings.refiner_max_concurrency)
+
+# Queued by flush() to tell the consumer to refine what is left and stop
+_FLUSH = object()
+
 class ThinkingRefiner:
     """Refines raw model thinking into a professional technical narrative in real-time."""
     
-    def __init__(self, session_id: str, claim_id: str, progress_callback: Callable):
+    def __init__(
+        self,
+        session_id: str,
+        claim_id: str,
+        progress_callback: Callable,
+        subscribers_alive: Optional[Callable[[], bool]] = None
+    ):
         self.session_id = session_id
         self.claim_id = claim_id
         self.progress_callback = progress_callback
-        self.buffer = ""
-        self.buffer_limit = 1000
-        self.is_refining = False
-        self.lock = asyncio.Lock()
+        # Lets refinement wind down once nobody is listening to this session
+        self.subscribers_alive = subscribers_alive or (lambda: True)
+        # Raw thought chunks are only joined when a refinement needs them.
+        # Only the consumer task touches them, so no lock is needed.
+        self._chunks: List[str] = []
+        self._size = 0
+        self.buffer_limit = BUFFER_LIMIT_BASE
+        self._consecutive_busy = 0
         self.phase_counter = 1
-        self.refinement_tasks: List[asyncio.Task] = []
+        # Producers enqueue raw text; a single consumer task buffers and refines it
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._consumer: Optional[asyncio.Task] = None
+        # Smoothed arrival rate of raw thinking, in chars per second
+        self._ema_rate: Optional[float] = None
+        self._last_arrival: Optional[float] = None
+        # Refinement needs OpenAI; without it raw thinking is streamed as-is
+        self._enabled = bool(settings.openai_api_key)
+        self._raw_sent: List[str] = []
+        self._raw_len = 0
+        self._last_raw_emit = 0.0
+        self._refining = ""
 
     async def add_raw_thought(self, text: str):
-        """Append raw thought chunk and refine if buffer limit reached."""
-        async with self.lock:
-            self.buffer += text
-            
-            # Check if we should trigger refinement (500+ chars)
-            if len(self.buffer) >= self.buffer_limit and not self.is_refining:
-                # Trigger background refinement without blocking the primary stream
-                task = asyncio.create_task(self._trigger_refinement())
-                self.refinement_tasks.append(task)
+        """Queue a raw thought chunk for the refinement consumer."""
+        if not self._enabled:
+            self._chunks.append(text)
+            self._size += len(text)
+            if asyncio.get_running_loop().time() - self._last_raw_emit >= RAW_EMIT_INTERVAL:
+                await self._emit_raw()
+            return
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+        self._track_rate(len(text))
+        self._queue.put_nowait(text)
+
+    def _track_rate(self, size: int):
+        now = asyncio.get_running_loop().time()
+        if self._last_arrival is not None:
+            dt = max(now - self._last_arrival, 1e-3)
+            rate = size / dt
+            if self._ema_rate is None:
+                self._ema_rate = rate
+            else:
+                self._ema_rate = (1 - RATE_EMA_ALPHA) * self._ema_rate + RATE_EMA_ALPHA * rate
+        self._last_arrival = now
+
+    def _should_refine(self) -> bool:
+        """Decide whether the buffered thinking is worth a refinement call now."""
+        ceiling = max(REFINE_MAX_CHARS, self.buffer_limit)
+        if self._size >= ceiling:
+            return True
+        rate = self._ema_rate
+        if self._size >= self.buffer_limit:
+            # A burst will fill the buffer further almost immediately: batch it
+            return not rate or (ceiling - self._size) / rate >= REFINE_BURST_WINDOW
+        if self._size >= self.buffer_limit // 2 and rate:
+            # Slow stream: don't make the reader wait for a full buffer
+            return (self.buffer_limit - self._size) / rate > REFINE_DROUGHT_WAIT
+        return False
+
+    @property
+    def buffer(self) -> str:
+        """Buffered raw thinking that has not been refined yet."""
+        return "".join(self._chunks)
 
     async def flush(self):
-        """Final refinement of remaining buffer and wait for tasks."""
-        async with self.lock:
-            if self.buffer:
-                # For flush, we process whatever is left.
-                # key fix: Call internal method without re-acquiring lock
-                await self._refine_buffer(force=True)
+        """
+        Refine everything that is left and wait for the consumer to finish.
+        After FLUSH_TIMEOUT seconds the refinement is abandoned and the rest is sent raw.
+        """
+        if not self._enabled:
+            if self._size or self._raw_sent:
+                await self._emit_raw(final=True)
+            return
+        if self._consumer is None:
+            return
+        self._queue.put_nowait(_FLUSH)
+        consumer, self._consumer = self._consumer, None
+        try:
+            await asyncio.wait_for(asyncio.shield(consumer), FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Thinking refinement for {self.claim_id} exceeded {FLUSH_TIMEOUT}s, sending the rest raw")
+            in_flight = self._refining
+            await self._cancel(consumer)
+            self._drain_queue()
+            remainder = (in_flight + self.buffer).strip()
+            self._chunks = []
+            self._size = 0
+            task_id = self.phase_counter
+            self.phase_counter += 1
+            await self.progress_callback({
+                "claim_id": self.claim_id,
+                "phase": f"PHASE {task_id}",
+                "message": remainder,
+                "is_refined": False,
+                "is_streaming_complete": True,
+                "is_final_thinking": True
+            })
+
+    async def close(self):
+        """Stop the consumer and drop unrefined thinking (e.g. after the stream failed)."""
+        consumer, self._consumer = self._consumer, None
+        if consumer is not None:
+            await self._cancel(consumer)
+        self._chunks = []
+        self._size = 0
+
+    @staticmethod
+    async def _cancel(consumer: asyncio.Task):
+        if not consumer.done():
+            consumer.cancel()
+            with suppress(asyncio.CancelledError):
+                await consumer
+
+    async def _emit_raw(self, final: bool = False):
+        """Pass buffered raw thinking straight through (refinement disabled)."""
+        text = "".join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        self._last_raw_emit = asyncio.get_running_loop().time()
+        if text:
+            self._raw_sent.append(text)
+            self._raw_len += len(text)
+            await self.progress_callback({
+                "claim_id": self.claim_id,
+                "phase": "THINKING",
+                "delta": text,
+                "accumulated_len": self._raw_len,
+                "is_refined": False,
+                "is_delta": True
+            })
+        if final:
+            await self.progress_callback({
+                "claim_id": self.claim_id,
+                "phase": "THINKING",
+                "message": "".join(self._raw_sent),
+                "is_refined": False,
+                "is_streaming_complete": True,
+                "is_final_thinking": True
+            })
+            self._raw_sent = []
+            self._raw_len = 0
+
+    async def _consume(self):
+        """Single consumer: buffer queued thoughts and refine once the limit is reached."""
+        while True:
+            text = await self._queue.get()
+            if text is _FLUSH:
+                async with _REFINE_SEM:
+                    await self._refine_buffer(force=True)
+                return
+            self._chunks.append(text)
+            self._size += len(text)
             
-            # Wait for any pending background tasks
-            if self.refinement_tasks:
-                pending = [t for t in self.refinement_tasks if not t.done()]
-                if pending:
-                    await asyncio.wait(pending, timeout=10) # 10s safety timeout
+            if self._should_refine():
+                # Producers keep queueing while this refinement waits for a slot and streams
+                async with _REFINE_SEM:
+                    # Thinking that arrived while waiting joins this refinement
+                    flush_requested = self._drain_queue()
+                    await self._refine_buffer(force=flush_requested)
+                if flush_requested:
+                    return
+                self._adapt_buffer_limit()
+
+    def _adapt_buffer_limit(self):
+        """Batch more aggressively while refinements can't keep up with the stream."""
+        if self._queue.empty():
+            self._consecutive_busy = 0
+            self.buffer_limit = BUFFER_LIMIT_BASE
+        else:
+            self._consecutive_busy += 1
+            self.buffer_limit = min(BUFFER_LIMIT_CEILING, BUFFER_LIMIT_BASE * 2 ** self._consecutive_busy)
 
-    async def _trigger_refinement(self):
-        """Wrapper for background refinement task with locking."""
-        async with self.lock:
-            await self._refine_buffer(force=False)
+    def _drain_queue(self) -> bool:
+        """Move queued thoughts into the buffer; return True if a flush was requested."""
+        while not self._queue.empty():
+            text = self._queue.get_nowait()
+            if text is _FLUSH:
+                return True
+            self._chunks.append(text)
+            self._size += len(text)
+        return False
 
     async def _refine_buffer(self, force: bool = False):
-        """Internal refinement logic. Assumes caller holds the lock."""
-        # Note: No 'async with self.lock' here as caller handles it
-        if not self.buffer:
+        """Internal refinement logic. Only called from the consumer task."""
+        if not self._size:
             return
 
+        # Materialize the buffer once, then keep only the unrefined tail
+        buffer = "".join(self._chunks)
         to_refine = ""
         
         if force:
-            to_refine = self.buffer
-            self.buffer = ""
+            cut_index = len(buffer)
         else:
-            import re
-            matches = list(re.finditer(r'[.!?]\s', self.buffer))
+            cut_index = _last_sentence_end(buffer)
             
-            if matches:
-                last_match = matches[-1]
-                cut_index = last_match.end()
-                to_refine = self.buffer[:cut_index]
-                self.buffer = self.buffer[cut_index:]
-            else:
-                if len(self.buffer) > 2000:
-                   to_refine = self.buffer
-                   self.buffer = ""
-                else:
-                    return
+            if cut_index == -1 and len(buffer) > REFINE_MAX_CHARS:
+                cut_index = len(buffer)
+            elif cut_index == -1:
+                # Keep the joined string so the next pass doesn't re-join
+                self._chunks = [buffer]
+                return
+        
+        to_refine = buffer[:cut_index]
+        self._chunks = [buffer[cut_index:]] if cut_index < len(buffer) else []
+        self._size = len(buffer) - cut_index
         
-        if not to_refine.strip():
+        stripped = to_refine.strip()
+        if not stripped:
+            return
+        
+        if not self.subscribers_alive():
+            logger.debug(f"No subscribers for session {self.session_id}, dropping thinking for {self.claim_id}")
             return
-            
-        self.is_refining = True
         
+        if len(stripped) < MIN_REFINE_CHARS or not any(c.isalpha() for c in stripped):
+            # Too little to be worth an OpenAI round trip: pass it through as-is
+            task_id = self.phase_counter
+            self.phase_counter += 1
+            await self.progress_callback({
+                "claim_id": self.claim_id,
+                "phase": f"PHASE {task_id}",
+                "message": stripped,
+                "is_refined": False,
+                "is_streaming_complete": True,
+                "is_final_thinking": force
+            })
+            return
+            
+        # Raw text of the refinement in flight, sent as-is if flush() gives up on it
+        self._refining = to_refine
         try:
             task_id = self.phase_counter
             self.phase_counter += 1
             
             # Narrative Refinement Prompt
-            # Narrative Refinement Prompt
-            prompt = f"""You are a senior editor and fact-checker analyzing a document. 
-            Synthesize the following raw thought process into a single, cohesive, professional narrative paragraph.
+            prompt = _REFINE_PROMPT_HEAD + to_refine + _REFINE_PROMPT_TAIL
             
-            Guidelines:
-            - Output ONLY one logical paragraph.
-            - FOCUS STRICTLY on the *intellectual analysis* of the content:
-              * Which specific statements are being isolated for verification?
-              * Why are these claims worth checking? (Subjective/Objective split)
-              * How verifiable does the evidence seem so far?
-            - DO NOT mention technical details like JSON, schemas, data fields (is_quote, confidence), or parsing logic.
-            - DO NOT mention "formatting" or "structuring the output".
-            - Maintain a professional, active voice.
+            logger.info(f"Triggering streaming refinement for task {task_id}")
             
-            Raw Thinking to Synthesize:
-            \"\"\"{to_refine}\"\"\"
-            """
+            # Invariant fields of every frame of this task
+            phase_label = f"PHASE {task_id}"
+            delta_base = {
+                "claim_id": self.claim_id,
+                "phase": phase_label,
+                "is_refined": True,
+                "is_delta": True
+            }
             
-            logger.info(f"Triggering streaming refinement for task {task_id}")
+            parts: List[str] = []
+            pending: List[str] = []
+            pending_len = 0
+            total_len = 0
             
-            full_refined_paragraph = ""
+            # Coalesce deltas: emit at most every DELTA_EMIT_INTERVAL seconds
+            # unless DELTA_EMIT_CHARS have accumulated since the last frame
+            loop = asyncio.get_running_loop()
+            last_emit = loop.time()
             
             # Use the new streaming client
             async for delta in openai_client.stream_refined_update(prompt):
+                if not self.subscribers_alive():
+                    # Client went away mid-stream; stop paying for the rest
+                    return
                 if delta:
-                    full_refined_paragraph += delta
-                    # Broadcast delta for live-typing effect
+                    parts.append(delta)
+                    pending.append(delta)
+                    pending_len += len(delta)
+                    total_len += len(delta)
+                    now = loop.time()
+                    if pending_len < DELTA_EMIT_CHARS and now - last_emit < DELTA_EMIT_INTERVAL:
+                        continue
+                    # Broadcast only the new text; the client appends it
                     await self.progress_callback({
-                        "claim_id": self.claim_id,
-                        "phase": f"PHASE {task_id}",
-                        "message": full_refined_paragraph,
-                        "is_refined": True,
-                        "is_delta": True
+                        **delta_base,
+                        "delta": "".join(pending),
+                        "accumulated_len": total_len
                     })
+                    pending = []
+                    pending_len = 0
+                    last_emit = now
+            
+            # Emit whatever was held back before closing the stream
+            if pending:
+                await self.progress_callback({
+                    **delta_base,
+                    "delta": "".join(pending),
+                    "accumulated_len": total_len
+                })
             
             # Final refined update for this chunk
             await self.progress_callback({
                 "claim_id": self.claim_id,
-                "phase": f"PHASE {task_id}",
-                "message": full_refined_paragraph,
+                "phase": phase_label,
+                "message": "".join(parts),
                 "is_refined": True,
                 "is_streaming_complete": True,
                 "is_final_thinking": force # If force, it means this is the end of flush
@@ -147,4 +398,4 @@ class ThinkingRefiner:
                 "is_raw_fallback": True
             })
         finally:
-            self.is_refining = False
+            self._refining = ""
@@ -4,11 +4,14 @@ Main FastAPI application entry point for the fact-checker service.
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from config import settings
 from api.routes import router as api_router
 from websocket_app.websocket_handler import connection_manager
+from core.session_manager import session_manager
+from agents.semantic_cache import semantic_cache
 
 # Configure logging
 logging.basicConfig(
@@ -34,10 +37,17 @@ async def lifespan(app: FastAPI):
         logger.info(f"GCP Project: {settings.gcp_project_id}")
         logger.info(f"Credentials: {settings.credentials_path}")
     
+    # Load the claim embedding model up front so the first verification doesn't pay for it
+    await asyncio.to_thread(semantic_cache.initialize)
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Fact-Checker API Service")
+    await asyncio.to_thread(semantic_cache.persist)
+    await session_manager.close()
+    from utils.openai_client import openai_client
+    await openai_client.close()
 
 
 # Create FastAPI application
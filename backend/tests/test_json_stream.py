@@ -0,0 +1,59 @@
+import sys
+import os
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.json_stream import JsonArrayStreamer
+
+CLAIMS_JSON = (
+    '[{"claim": "Revenue grew 20% in 2023", "verbatim": "He said \\"revenue grew\\" [sic]", "type": "statistical"},'
+    ' {"claim": "The bridge opened in 1932 {approx.}", "context": "a ] and a } inside a string", "is_quote": false}]'
+)
+EXPECTED = [
+    {"claim": "Revenue grew 20% in 2023", "verbatim": 'He said "revenue grew" [sic]', "type": "statistical"},
+    {"claim": "The bridge opened in 1932 {approx.}", "context": "a ] and a } inside a string", "is_quote": False},
+]
+
+
+def feed_in_chunks(text: str, size: int) -> list:
+    streamer = JsonArrayStreamer()
+    elements = []
+    for start in range(0, len(text), size):
+        elements.extend(streamer.feed(text[start:start + size]))
+    return elements
+
+
+def test_whole_array_in_one_chunk():
+    assert feed_in_chunks(CLAIMS_JSON, len(CLAIMS_JSON)) == EXPECTED
+
+
+def test_every_chunk_boundary():
+    # Splits land inside strings, right after backslashes and between brackets
+    for size in range(1, 12):
+        assert feed_in_chunks(CLAIMS_JSON, size) == EXPECTED, size
+
+
+def test_elements_are_emitted_as_soon_as_they_close():
+    streamer = JsonArrayStreamer()
+    first_end = CLAIMS_JSON.index("},") + 1
+    assert streamer.feed(CLAIMS_JSON[:first_end - 1]) == []
+    assert streamer.feed(CLAIMS_JSON[first_end - 1:first_end + 3]) == EXPECTED[:1]
+    assert streamer.feed(CLAIMS_JSON[first_end + 3:]) == EXPECTED[1:]
+
+
+def test_preamble_and_code_fence_are_ignored():
+    text = 'Sure, here are the "claims" you asked for:\n```json\n' + CLAIMS_JSON + '\n```'
+    assert feed_in_chunks(text, 7) == EXPECTED
+
+
+def test_unparsable_element_is_skipped():
+    text = '[{"claim": "ok"}, {"claim": bad}, {"claim": "also ok"}]'
+    assert feed_in_chunks(text, 5) == [{"claim": "ok"}, {"claim": "also ok"}]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"[SUCCESS] {name}")
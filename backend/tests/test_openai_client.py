@@ -0,0 +1,39 @@
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.openai_client import OpenAIClient
+
+@pytest.mark.asyncio
+async def test_stream_yields_each_delta_once():
+    print("\n--- TEST: OPENAI STREAM DELTA DEDUPLICATION ---\n")
+    
+    # A chunk that matches both the Responses delta path and the ChatCompletion fallback
+    chunk = SimpleNamespace(
+        type="response.output_text.delta",
+        delta="Hello",
+        choices=[SimpleNamespace(delta=SimpleNamespace(content="Hello"))]
+    )
+    
+    async def fake_stream():
+        yield chunk
+    
+    async def create(**kwargs):
+        return fake_stream()
+    
+    client = OpenAIClient()
+    client._client = SimpleNamespace(responses=SimpleNamespace(create=create))
+    
+    deltas = [delta async for delta in client.stream_refined_update("prompt")]
+    print(f"Deltas yielded: {deltas}")
+    assert deltas == ["Hello"], deltas
+    print("[SUCCESS] Each delta is yielded exactly once.")
+
+if __name__ == "__main__":
+    asyncio.run(test_stream_yields_each_delta_once())
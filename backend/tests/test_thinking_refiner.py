@@ -3,9 +3,12 @@ import logging
 import sys
 import os
 
+import pytest
+
 # Add backend directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from core import thinking_refiner
 from core.thinking_refiner import ThinkingRefiner
 
 # Configure logging
@@ -21,11 +24,11 @@ async def test_refiner():
     async def progress_callback(update):
         nonlocal current_message
         if update.get("is_delta"):
-            # In a real UI, we append or replace. For terminal, we show the delta or just current state
-            delta = update.get("message")[len(current_message):]
+            # Delta frames carry only the new text; the UI appends it
+            delta = update.get("delta", "")
             if delta:
                 print(delta, end="", flush=True)
-                current_message = update.get("message")
+                current_message += delta
         elif update.get("is_streaming_complete"):
             print("\n[STREAM COMPLETE]")
             # Log final message length
@@ -69,5 +72,55 @@ async def test_refiner():
     else:
         print("\n[FAILURE] Narrative Refiner Agent FAILED to generate updates.")
 
+@pytest.mark.asyncio
+async def test_close_stops_consumer():
+    print("\n--- TEST: REFINER CLOSE AFTER A FAILED STREAM ---\n")
+    
+    async def progress_callback(update):
+        pass
+    
+    refiner = ThinkingRefiner("test_session", "test_claim", progress_callback)
+    refiner._enabled = True  # Exercise the queue/consumer path without an OpenAI key
+    await refiner.add_raw_thought("Partial thinking that never gets flushed")
+    consumer = refiner._consumer
+    
+    # The stream failed: the owner closes instead of flushing
+    await refiner.close()
+    print(f"Consumer done: {consumer.done()}")
+    assert consumer.done() and refiner._consumer is None
+    print("[SUCCESS] Closing a refiner leaves no consumer task behind.")
+
+@pytest.mark.asyncio
+async def test_flush_is_bounded():
+    print("\n--- TEST: FLUSH WITH A HUNG REFINEMENT STREAM ---\n")
+    
+    updates = []
+    
+    async def progress_callback(update):
+        updates.append(update)
+    
+    async def hung_stream(prompt):
+        await asyncio.Event().wait()
+        yield ""
+    
+    original_stream = thinking_refiner.openai_client.stream_refined_update
+    original_timeout = thinking_refiner.FLUSH_TIMEOUT
+    thinking_refiner.openai_client.stream_refined_update = hung_stream
+    thinking_refiner.FLUSH_TIMEOUT = 0.2
+    try:
+        refiner = ThinkingRefiner("test_session", "test_claim", progress_callback)
+        refiner._enabled = True
+        await refiner.add_raw_thought("Checking the reported figure against the official statistics release. " * 3)
+        await refiner.flush()
+    finally:
+        thinking_refiner.openai_client.stream_refined_update = original_stream
+        thinking_refiner.FLUSH_TIMEOUT = original_timeout
+    
+    print(f"Last update: {updates[-1]}")
+    assert updates[-1]["is_final_thinking"] and updates[-1]["message"].startswith("Checking")
+    print("[SUCCESS] Flush gives up on a hung refinement and sends the rest raw.")
+
 if __name__ == "__main__":
+    asyncio.run(test_close_stops_consumer())
+    asyncio.run(test_flush_is_bounded())
     asyncio.run(test_refiner())
@@ -0,0 +1,54 @@
+import sys
+import os
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.verification_agent import VerificationAgent
+
+RESPONSE = """## Thinking Process
+Looked for the official statistics release.
+## Verification Status: PARTIALLY_VERIFIED
+## Confidence Score
+85
+## Evidence Summary
+The figure is right, the year is not.
+   ## Key Findings
+- Figure matches the release
+* Year is off by one
+not a bullet
+"""
+
+
+def parse(text: str):
+    return VerificationAgent()._parse_verification_sections(text, [])
+
+
+def test_sections_are_parsed():
+    result, verdict_found = parse(RESPONSE)
+    assert verdict_found
+    assert result["thinking_process"] == "Looked for the official statistics release."
+    assert result["status"] == "PARTIALLY_VERIFIED"
+    assert result["confidence"] == 0.85  # percentages are scaled to 0-1
+    assert result["evidence_summary"] == "The figure is right, the year is not."
+    assert result["key_findings"] == ["Figure matches the release", "Year is off by one"]
+
+
+def test_longer_status_keywords_win():
+    for status in ["VERIFIED", "PARTIALLY_VERIFIED", "UNVERIFIED", "DISPUTED", "FALSE"]:
+        result, _ = parse(f"## Verification Status\n**{status}**\n## Confidence Score\n0.7")
+        assert result["status"] == status, status
+
+
+def test_missing_verdict_is_reported():
+    for text in ["", "## Thinking Process\nThe response was cut off before the ver"]:
+        result, verdict_found = parse(text)
+        assert not verdict_found
+        assert result["status"] == "UNVERIFIED" and result["confidence"] == 0.5
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"[SUCCESS] {name}")
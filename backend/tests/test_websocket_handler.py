@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import os
+
+import orjson
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from websocket_app.websocket_handler import ConnectionManager, ConnectionOutbox
+
+
+def delta(claim_id: str, text: str, accumulated_len: int) -> dict:
+    return {
+        "claim_id": claim_id,
+        "phase": "PHASE 1",
+        "delta": text,
+        "accumulated_len": accumulated_len,
+        "is_refined": True,
+        "is_delta": True
+    }
+
+
+def test_delta_frame_round_trips():
+    manager = ConnectionManager()
+    # The second frame reuses the cached envelope prefix of the stream
+    for text in ['He said "no" \\ twice\n', "café — \U0001f600"]:
+        frame = orjson.loads(manager._encode_delta_frame(delta("claim_1", text, 42)))
+        assert frame["type"] == "thinking_update"
+        assert frame["data"] == delta("claim_1", text, 42)
+        assert frame["timestamp"]
+
+
+def test_delta_frame_without_accumulated_len():
+    data = delta("claim_1", "text", 0)
+    del data["accumulated_len"]
+    frame = orjson.loads(ConnectionManager()._encode_delta_frame(data))
+    assert frame["data"] == data
+
+
+@pytest.mark.asyncio
+async def test_full_outbox_coalesces_deltas_of_a_stream():
+    manager = ConnectionManager()
+    outbox = ConnectionOutbox(manager._encode_delta_frame, maxsize=2)
+    for data in [delta("a", "Hel", 3), delta("b", "Other", 5), delta("a", "lo", 5)]:
+        outbox.put(manager._encode_delta_frame(data), data)
+    
+    first = orjson.loads(await outbox.get())["data"]
+    second = orjson.loads(await outbox.get())["data"]
+    assert (first["claim_id"], first["delta"], first["accumulated_len"]) == ("a", "Hello", 5)
+    assert (second["claim_id"], second["delta"]) == ("b", "Other")
+
+
+@pytest.mark.asyncio
+async def test_full_outbox_keeps_order_and_drops_nothing():
+    manager = ConnectionManager()
+    outbox = ConnectionOutbox(manager._encode_delta_frame, maxsize=2)
+    first = delta("a", "Hel", 3)
+    outbox.put(manager._encode_delta_frame(first), first)
+    outbox.put('{"type":"status"}')
+    # A frame queued after the stream's last delta: the new delta can't jump ahead of it
+    second = delta("a", "lo", 5)
+    outbox.put(manager._encode_delta_frame(second), second)
+    outbox.put('{"type":"error"}')
+    
+    received = [orjson.loads(await outbox.get()) for _ in range(4)]
+    assert [frame["type"] for frame in received] == ["thinking_update", "status", "thinking_update", "error"]
+    assert received[0]["data"]["delta"] + received[2]["data"]["delta"] == "Hello"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            result = test()
+            if asyncio.iscoroutine(result):
+                asyncio.run(result)
+            print(f"[SUCCESS] {name}")
@@ -1,4 +1,11 @@
 """Utilities package initialization."""
-from .vertex_client import vertex_client
+from importlib import import_module
 
 __all__ = ["vertex_client"]
+
+
+def __getattr__(name):
+    # Importing a light utility shouldn't construct the Vertex AI client
+    if name in __all__:
+        return getattr(import_module(f".{name}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,73 @@
+"""
+Incremental parser for streamed JSON arrays.
+Emits each top-level array element as soon as its closing bracket arrives.
+"""
+import logging
+from typing import List, Any
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayStreamer:
+    """
+    Bracket-depth scanner over a streamed JSON array of objects.
+
+    Feed text chunks as they arrive; every call returns the elements of the
+    top-level array that became complete during that chunk. Elements that
+    fail to parse are skipped - callers should still validate the full
+    response once the stream ends.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element_start = -1
+        self._pos = 0
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume a chunk of text and return any newly completed elements."""
+        completed = []
+        buffer = self._buffer + text
+        i = self._pos
+
+        while i < len(buffer):
+            ch = buffer[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+                if self._depth == 2:
+                    self._element_start = i
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 1 and self._element_start != -1:
+                    element_text = buffer[self._element_start:i + 1]
+                    self._element_start = -1
+                    try:
+                        completed.append(orjson.loads(element_text))
+                    except orjson.JSONDecodeError:
+                        logger.debug("Skipping unparsable streamed array element")
+            i += 1
+
+        # Keep only the unfinished element (if any) buffered
+        if self._element_start != -1:
+            self._buffer = buffer[self._element_start:]
+            self._pos = i - self._element_start
+            self._element_start = 0
+        else:
+            self._buffer = ""
+            self._pos = 0
+
+        return completed
@@ -5,11 +5,20 @@ Uses the modern OpenAI Responses API with streaming support.
 import logging
 import asyncio
 from typing import Optional, Dict, Any, AsyncGenerator
+import httpx
 from openai import AsyncOpenAI
 from config import settings
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+except ImportError:
+    h2 = None
+
 logger = logging.getLogger(__name__)
 
+# One keep-alive pool shared by every refinement call in the process
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0)
+
 class OpenAIClient:
     """Wrapper for OpenAI API using the modern Responses interface with streaming support."""
     
@@ -17,6 +26,7 @@ class OpenAIClient:
         self.api_key = settings.openai_api_key
         self.model_name = settings.openai_refiner_model
         self._client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
 
     @property
     def client(self) -> AsyncOpenAI:
@@ -24,9 +34,19 @@ class OpenAIClient:
             if not self.api_key:
                 logger.error("OpenAI API key not configured")
                 raise ValueError("OPENAI_API_KEY is missing from configuration")
-            self._client = AsyncOpenAI(api_key=self.api_key)
+            self._http_client = httpx.AsyncClient(http2=h2 is not None, limits=HTTP_POOL_LIMITS)
+            self._client = AsyncOpenAI(api_key=self.api_key, http_client=self._http_client)
         return self._client
 
+    async def close(self):
+        """Close the pooled HTTP connections."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
     async def generate_refined_update(self, prompt: str) -> str:
         """
         Generate a refined update using the OpenAI Responses API (non-streaming).
@@ -66,17 +86,19 @@ class OpenAIClient:
                 stream=True
             )
             async for chunk in stream:
-                # The Responses API uses specific event types for streaming
+                # The Responses API uses specific event types for streaming.
+                # Exactly one extraction path applies per chunk so text is never yielded twice.
                 chunk_type = getattr(chunk, 'type', None)
                 
                 # Path 1: Targeted delta extraction for newer Responses API events
                 if chunk_type == 'response.output_text.delta':
-                    if hasattr(chunk, 'delta') and chunk.delta:
+                    if getattr(chunk, 'delta', None):
                         yield chunk.delta
+                    continue
                 
                 # Path 2: Handle reasoning items if needed in future (currently skipping reasoning)
                 # elif chunk_type == 'response.output_reasoning.delta':
-                #     pass
+                #     continue
 
                 # Path 3: Generic fallback for other SDK versions/structures
                 if hasattr(chunk, 'output') and isinstance(chunk.output, list):
@@ -87,6 +109,7 @@ class OpenAIClient:
                                 yield delta.text
                             elif isinstance(delta, str):
                                 yield delta
+                    continue
 
                 # Path 4: Standard ChatCompletion delta fallback
                 if hasattr(chunk, 'choices') and chunk.choices:
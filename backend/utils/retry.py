@@ -0,0 +1,159 @@
+"""
+Retry helpers for transient Gemini / Vertex AI errors.
+Kept free of SDK imports so callers can use them without loading the Vertex client.
+"""
+import asyncio
+import inspect
+import logging
+import random
+from functools import lru_cache, wraps
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Retryable failures by HTTP status
+_RETRYABLE_CODES = {429: "Rate limit hit", 503: "Service unavailable"}
+
+
+@lru_cache(maxsize=None)
+def _sdk_error_types() -> Tuple[type, Dict[type, int]]:
+    """
+    SDK exception types to classify: google-genai raises APIError subclasses carrying .code,
+    google-api-core (gRPC paths) raises one exception type per status. Resolved on first
+    use, when the SDK that raised the error is already loaded.
+    """
+    from google.genai import errors as genai_errors
+    from google.api_core import exceptions as api_exceptions
+    return genai_errors.APIError, {
+        api_exceptions.TooManyRequests: 429,  # includes ResourceExhausted
+        api_exceptions.ServiceUnavailable: 503,
+    }
+
+
+def _error_code(e: Exception) -> Optional[int]:
+    """HTTP status of a retryable SDK error, or None (type checks only, no str(e))."""
+    api_error, api_core_errors = _sdk_error_types()
+    if isinstance(e, api_error):
+        return e.code if e.code in _RETRYABLE_CODES else None
+    for error_type, code in api_core_errors.items():
+        if isinstance(e, error_type):
+            return code
+    return None
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """Whether an exception raised by the Gen AI SDK is a quota / rate-limit (429) error."""
+    return _error_code(e) == 429
+
+
+def is_retryable_error(e: Exception) -> bool:
+    """Whether an SDK exception is transient: rate limited (429) or service unavailable (503)."""
+    return _error_code(e) is not None
+
+
+def server_retry_delay(e: Exception) -> Optional[float]:
+    """
+    Seconds the server asked us to wait before retrying, if the error carries a hint:
+    a retry_delay attribute, a google.rpc.RetryInfo detail, or a Retry-After header.
+    """
+    retry_delay = getattr(e, "retry_delay", None)
+    if retry_delay is not None:
+        if hasattr(retry_delay, "total_seconds"):
+            return retry_delay.total_seconds()
+        return getattr(retry_delay, "seconds", 0) + getattr(retry_delay, "nanos", 0) / 1e9
+    
+    details = getattr(e, "details", None)
+    if isinstance(details, dict):
+        for detail in details.get("error", {}).get("details", None) or []:
+            if isinstance(detail, dict) and detail.get("@type", "").endswith("RetryInfo"):
+                try:
+                    return float(str(detail.get("retryDelay", "")).rstrip("s"))
+                except ValueError:
+                    pass
+    
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def decorrelated_jitter(prev_delay: float, base_delay: float, max_delay: float) -> float:
+    """
+    Next backoff delay using "decorrelated jitter": random between base_delay and
+    3x the previous delay, capped. Spreads concurrent retries apart instead of
+    waking them together.
+    """
+    return min(max_delay, random.uniform(base_delay, max(base_delay, prev_delay) * 3))
+
+
+def next_retry_delay(e: Exception, prev_delay: float, base_delay: float, max_delay: float) -> float:
+    """
+    Delay before retrying after e: decorrelated jitter, but never sooner than the
+    server asked. The server's hint is capped at max_delay too, so a quota reset
+    minutes away doesn't stall the caller for that long.
+    """
+    delay = decorrelated_jitter(prev_delay, base_delay, max_delay)
+    hint = server_retry_delay(e)
+    if hint:
+        delay = max(delay, min(hint, max_delay))
+    return delay
+
+
+def with_retry(max_retries: int = 3, base_delay: float = 2.0, max_delay: float = 30.0):
+    """
+    Decorator retrying transient (429 / 503) errors with jittered backoff. Supports both async functions and async generators.
+    Callers that run their own retry loop can pass max_retries=0 to the decorated function.
+    """
+    def decorator(func):
+        if inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def wrapper(*args, max_retries: int = max_retries, **kwargs):
+                retries = 0
+                delay = base_delay
+                while True:
+                    try:
+                        stream = func(*args, **kwargs)
+                        try:
+                            async for item in stream:
+                                yield item
+                        finally:
+                            # Close the inner stream promptly (stops its producer task)
+                            # when the consumer stops iterating early
+                            await stream.aclose()
+                        return
+                    except Exception as e:
+                        code = _error_code(e)
+                        if code is None or retries >= max_retries:
+                            logger.error(f"Streaming execution failed after {retries} retries: {e}")
+                            raise e
+                        
+                        retries += 1
+                        delay = next_retry_delay(e, delay, base_delay, max_delay)
+                        logger.warning(f"{_RETRYABLE_CODES[code]} in stream ({code}). Retrying in {delay:.2f}s (Attempt {retries}/{max_retries}). Error: {e}")
+                        await asyncio.sleep(delay)
+            return wrapper
+        else:
+            @wraps(func)
+            async def wrapper(*args, max_retries: int = max_retries, **kwargs):
+                retries = 0
+                delay = base_delay
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        code = _error_code(e)
+                        if code is None or retries >= max_retries:
+                            logger.error(f"Execution failed after {retries} retries: {e}")
+                            raise e
+                        
+                        retries += 1
+                        delay = next_retry_delay(e, delay, base_delay, max_delay)
+                        logger.warning(f"{_RETRYABLE_CODES[code]} ({code}). Retrying in {delay:.2f}s (Attempt {retries}/{max_retries}). Error: {e}")
+                        await asyncio.sleep(delay)
+            return wrapper
+    return decorator
@@ -5,61 +5,44 @@ Handles authentication, model initialization, and grounding configuration.
 import os
 import logging
 import asyncio
+from contextlib import suppress
 from typing import Optional, Dict, Any, List, AsyncGenerator
+import httpx
 from google import genai
 from google.genai import types
 
 from config import settings
+# Retry helpers live in a dependency-free module; re-exported here for existing importers
+from utils.retry import (  # noqa: F401
+    decorrelated_jitter,
+    is_rate_limit_error,
+    is_retryable_error,
+    server_retry_delay,
+    with_retry,
+)
 
-import random
-from functools import wraps
-import inspect
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+except ImportError:
+    h2 = None
 
 logger = logging.getLogger(__name__)
 
+# Connection pool for the Gen AI SDK's async transport, sized for many concurrently streaming sessions
+GENAI_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
 
-def with_retry(max_retries: int = 3, base_delay: float = 2.0, max_delay: float = 30.0):
-    """Decorator for exponential backoff retry logic. Supports both async functions and async generators."""
-    def decorator(func):
-        if inspect.isasyncgenfunction(func):
-            @wraps(func)
-            async def wrapper(*args, **kwargs):
-                retries = 0
-                while True:
-                    try:
-                        async for item in func(*args, **kwargs):
-                            yield item
-                        return
-                    except Exception as e:
-                        is_rate_limit = "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)
-                        if not is_rate_limit or retries >= max_retries:
-                            logger.error(f"Streaming execution failed after {retries} retries: {e}")
-                            raise e
-                        
-                        retries += 1
-                        delay = min(base_delay * (2 ** (retries - 1)) + random.uniform(0, 1), max_delay)
-                        logger.warning(f"Rate limit hit in stream (429). Retrying in {delay:.2f}s (Attempt {retries}/{max_retries}). Error: {e}")
-                        await asyncio.sleep(delay)
-            return wrapper
-        else:
-            @wraps(func)
-            async def wrapper(*args, **kwargs):
-                retries = 0
-                while True:
-                    try:
-                        return await func(*args, **kwargs)
-                    except Exception as e:
-                        is_rate_limit = "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)
-                        if not is_rate_limit or retries >= max_retries:
-                            logger.error(f"Execution failed after {retries} retries: {e}")
-                            raise e
-                        
-                        retries += 1
-                        delay = min(base_delay * (2 ** (retries - 1)) + random.uniform(0, 1), max_delay)
-                        logger.warning(f"Rate limit hit (429). Retrying in {delay:.2f}s (Attempt {retries}/{max_retries}). Error: {e}")
-                        await asyncio.sleep(delay)
-            return wrapper
-    return decorator
+# Parsed stream events buffered ahead of the consumer before gRPC reads pause
+STREAM_QUEUE_SIZE = 8
+_STREAM_END = object()
+
+
+def _web_citations(gm) -> List[Dict[str, Any]]:
+    """Title/URI citations for the web sources in a grounding metadata block."""
+    return [
+        {"title": chunk.web.title, "uri": chunk.web.uri}
+        for chunk in gm.grounding_chunks or ()
+        if chunk.web
+    ]
 
 
 class VertexAIClient:
@@ -71,12 +54,34 @@ class VertexAIClient:
         self.model_name = settings.gemini_model
         self.initialized = False
         self.client: Optional[genai.Client] = None
+        # Created on first use so it belongs to the serving event loop
+        self._init_lock: Optional[asyncio.Lock] = None
+        # Model name is fixed for the client's lifetime, so decide on thinking support once
+        model_lower = self.model_name.lower()
+        self._supports_thinking = "gemini-3" in model_lower or "thinking" in model_lower
+        self._thinking_cfg = types.ThinkingConfig(
+            include_thoughts=settings.include_thoughts,
+        ) if self._supports_thinking else None
+        # GenerateContentConfig per (temperature, max_output_tokens, use_grounding, extra items);
+        # callers use a handful of fixed settings, so this stays small
+        self._configs: Dict[tuple, types.GenerateContentConfig] = {}
     
-    def initialize(self):
-        """Initialize the Gen AI Client."""
+    async def initialize(self):
+        """
+        Initialize the Gen AI Client once, however many first calls arrive concurrently.
+        Credential discovery can block, so the client is built off the event loop.
+        """
         if self.initialized:
             return
         
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self.initialized:
+                return
+            await asyncio.to_thread(self._initialize)
+    
+    def _initialize(self):
         try:
             # Set credentials path for the SDK to pick up if needed
             if settings.credentials_path.exists():
@@ -86,7 +91,10 @@ class VertexAIClient:
             self.client = genai.Client(
                 vertexai=True,
                 project=self.project_id,
-                location=self.location
+                location=self.location,
+                http_options=types.HttpOptions(
+                    async_client_args={"limits": GENAI_POOL_LIMITS, "http2": h2 is not None}
+                )
             )
             
             self.initialized = True
@@ -96,6 +104,51 @@ class VertexAIClient:
             logger.error(f"Failed to initialize Gen AI Client: {e}")
             raise
     
+    def _config_for(
+        self,
+        temperature: Optional[float],
+        max_output_tokens: Optional[int],
+        use_grounding: bool,
+        extra_config: Optional[Dict[str, Any]]
+    ) -> types.GenerateContentConfig:
+        """Generation config for a call, reusing a cached instance when the inputs are hashable."""
+        temperature = temperature or settings.gemini_temperature
+        max_output_tokens = max_output_tokens or settings.gemini_max_output_tokens
+        extra_items = tuple(sorted(extra_config.items())) if extra_config else ()
+        key = (temperature, max_output_tokens, use_grounding, extra_items)
+        try:
+            config = self._configs.get(key)
+        except TypeError:
+            # Unhashable extra_config values: build per call
+            return self._build_config(*key)
+        if config is None:
+            config = self._configs[key] = self._build_config(*key)
+        return config
+    
+    def _build_config(
+        self,
+        temperature: float,
+        max_output_tokens: int,
+        use_grounding: bool,
+        extra_items: tuple
+    ) -> types.GenerateContentConfig:
+        """Build a GenerateContentConfig (see _config_for for the cached path)."""
+        tools = []
+        if use_grounding:
+            tools.append(types.Tool(google_search=types.GoogleSearch()))
+            
+        config_params = {
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "tools": tools if tools else None,
+            "thinking_config": self._thinking_cfg
+        }
+        
+        if extra_items:
+            config_params.update(extra_items)
+            
+        return types.GenerateContentConfig(**config_params)
+    
     @with_retry(max_retries=5, base_delay=5.0)
     async def generate_with_grounding(
         self,
@@ -110,29 +163,12 @@ class VertexAIClient:
         Generate content with optional Google Search grounding.
         """
         if not self.initialized:
-            self.initialize()
+            await self.initialize()
         
-        # Prepare configuration
-        tools = []
-        if use_grounding:
-            tools.append(types.Tool(google_search=types.GoogleSearch()))
-            
-        config_params = {
-            "temperature": temperature or settings.gemini_temperature,
-            "max_output_tokens": max_output_tokens or settings.gemini_max_output_tokens,
-            "tools": tools if tools else None,
-            "thinking_config": types.ThinkingConfig(
-                include_thoughts=settings.include_thoughts,
-            ) if "gemini-3" in self.model_name.lower() or "thinking" in self.model_name.lower() else None
-        }
-        
-        if extra_config:
-            config_params.update(extra_config)
-            
-        config = types.GenerateContentConfig(**config_params)
+        config = self._config_for(temperature, max_output_tokens, use_grounding, extra_config)
         
         target_model = model_name or self.model_name
-        logger.info(f"Generating content with model: {target_model} (grounding={use_grounding})")
+        logger.info("Generating content with model: %s (grounding=%s)", target_model, use_grounding)
         
         try:
             # Generate content using native async client
@@ -165,23 +201,18 @@ class VertexAIClient:
                 # Extract grounding metadata
                 if candidate.grounding_metadata:
                     gm = candidate.grounding_metadata
+                    # Map grounding chunks to citations (one list, shared by both fields)
+                    citations = _web_citations(gm)
+                    result["citations"] = citations
                     result["grounding_metadata"] = {
                         "web_search_queries": getattr(gm, 'web_search_queries', []),
-                        "grounding_attributions": []
+                        "grounding_attributions": citations
                     }
-                    
-                    # Map grounding chunks to citations
-                    if gm.grounding_chunks:
-                        for chunk in gm.grounding_chunks:
-                            if chunk.web:
-                                citation = {
-                                    "title": chunk.web.title,
-                                    "uri": chunk.web.uri
-                                }
-                                result["citations"].append(citation)
-                                result["grounding_metadata"]["grounding_attributions"].append(citation)
             
-            logger.info(f"Successfully generated response: text_len={len(result['text'])}, thought_len={len(result['thought'])}, citations={len(result['citations'])}")
+            logger.info(
+                "Successfully generated response: text_len=%d, thought_len=%d, citations=%d",
+                len(result["text"]), len(result["thought"]), len(result["citations"])
+            )
             return result
             
         except Exception as e:
@@ -199,30 +230,15 @@ class VertexAIClient:
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Generate content with streaming.
+        Yields one event per upstream block: {"thought": str, "text": str, "citations": list},
+        where any field may be empty.
         """
         if not self.initialized:
-            self.initialize()
-            
-        # Prepare configuration
-        tools = []
-        if use_grounding:
-            tools.append(types.Tool(google_search=types.GoogleSearch()))
-            
-        config_params = {
-            "temperature": temperature or settings.gemini_temperature,
-            "max_output_tokens": max_output_tokens or settings.gemini_max_output_tokens,
-            "tools": tools if tools else None,
-            "thinking_config": types.ThinkingConfig(
-                include_thoughts=settings.include_thoughts,
-            ) if "gemini-3" in self.model_name.lower() or "thinking" in self.model_name.lower() else None
-        }
+            await self.initialize()
         
-        if extra_config:
-            config_params.update(extra_config)
-            
-        config = types.GenerateContentConfig(**config_params)
+        config = self._config_for(temperature, max_output_tokens, use_grounding, extra_config)
         
-        logger.info(f"Starting streaming generation: model={self.model_name}, grounding={use_grounding}")
+        logger.info("Starting streaming generation: model=%s, grounding=%s", self.model_name, use_grounding)
         
         try:
             # Use the native async streaming interface
@@ -232,47 +248,80 @@ class VertexAIClient:
                 config=config
             )
             
-            chunk_count = 0
-            # For streaming responses, we iterate over segments using async iterator
+            # Parse blocks in a producer task so gRPC reads and decoding overlap
+            # with whatever the consumer awaits (refiner, WebSocket sends)
+            queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+            producer = asyncio.create_task(self._pump(stream, queue))
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is _STREAM_END:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                if not producer.done():
+                    producer.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await producer
+            
+            chunk_count = producer.result()
+            logger.info("Streaming generation completed successfully after %d blocks", chunk_count)
+                        
+        except Exception as e:
+            logger.error(f"Error in streaming generation: {e}")
+            raise
+    
+    async def _pump(self, stream, queue: asyncio.Queue) -> int:
+        """Parse stream blocks into events on queue; returns the number of blocks read."""
+        chunk_count = 0
+        # Checked once per stream: unguarded debug f-strings would be formatted for every block
+        debug = logger.isEnabledFor(logging.DEBUG)
+        try:
             async for block in stream:
                 chunk_count += 1
-                logger.debug(f"Raw stream block {chunk_count}: {getattr(block, '__dict__', block)}")
+                if debug:
+                    logger.debug("Raw stream block %d", chunk_count)
                 if not block.candidates:
-                    logger.debug(f"Stream block {chunk_count} has no candidates")
+                    if debug:
+                        logger.debug("Stream block %d has no candidates", chunk_count)
                     continue
                     
                 candidate = block.candidates[0]
                 
-                # Process parts in current chunk
-                if candidate.content and candidate.content.parts:
-                    for part in candidate.content.parts:
+                # Merge everything in this block into one event: one queue hop and
+                # one consumer iteration per upstream block instead of one per part
+                thoughts = []
+                texts = []
+                content = candidate.content
+                parts = content.parts if content else None
+                if parts:
+                    for part in parts:
+                        text = part.text
+                        if not text:
+                            continue
                         if part.thought:
-                            logger.debug(f"Stream block {chunk_count}: yielding thought ({len(part.text)} chars)")
-                            yield {"type": "thought", "text": part.text}
-                        elif part.text:
-                            logger.debug(f"Stream block {chunk_count}: yielding text ({len(part.text)} chars)")
-                            yield {"type": "text", "text": part.text}
+                            thoughts.append(text)
+                        else:
+                            texts.append(text)
                 
                 # Extract grounding metadata if present
-                if candidate.grounding_metadata:
-                    gm = candidate.grounding_metadata
-                    citations = []
-                    if gm.grounding_chunks:
-                        for chunk_data in gm.grounding_chunks:
-                            if chunk_data.web:
-                                citations.append({
-                                    "title": chunk_data.web.title,
-                                    "uri": chunk_data.web.uri
-                                })
-                    if citations:
-                        logger.debug(f"Stream block {chunk_count}: yielding {len(citations)} citations")
-                        yield {"type": "citations", "data": citations}
-            
-            logger.info(f"Streaming generation completed successfully after {chunk_count} blocks")
-                        
+                citations = _web_citations(candidate.grounding_metadata) if candidate.grounding_metadata else []
+                
+                if thoughts or texts or citations:
+                    event = {"thought": "".join(thoughts), "text": "".join(texts), "citations": citations}
+                    if debug:
+                        logger.debug(
+                            "Stream block %d: yielding thought=%d chars, text=%d chars, citations=%d",
+                            chunk_count, len(event["thought"]), len(event["text"]), len(citations)
+                        )
+                    await queue.put(event)
         except Exception as e:
-            logger.error(f"Error in streaming generation: {e}")
-            raise
+            await queue.put(e)
+            return chunk_count
+        await queue.put(_STREAM_END)
+        return chunk_count
 
 
 # Global Vertex AI client instance
@@ -3,40 +3,136 @@ WebSocket connection manager for real-time updates.
 Handles connection lifecycle, session-based broadcasting, and message streaming.
 """
 from fastapi import WebSocket
-from typing import Dict, List
+from starlette.websockets import WebSocketState
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+from collections import deque
+import asyncio
 import logging
-import json
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# Delta frames made only of these fields take the pre-serialized fast path
+_DELTA_FRAME_KEYS = {"claim_id", "phase", "delta", "accumulated_len", "is_refined", "is_delta"}
+DELTA_PREFIX_CACHE_SIZE = 1024
+
+_JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Last formatted timestamp, keyed by the millisecond it was formatted for
+_timestamp_cache = {"ms": -1, "iso": ""}
+
+
+def _timestamp() -> str:
+    """Timezone-aware UTC ISO timestamp, formatted at most once per millisecond."""
+    now_ns = time.time_ns()
+    ms = now_ns // 1_000_000
+    if ms != _timestamp_cache["ms"]:
+        _timestamp_cache["ms"] = ms
+        _timestamp_cache["iso"] = datetime.fromtimestamp(now_ns / 1e9, timezone.utc).isoformat(timespec="milliseconds")
+    return _timestamp_cache["iso"]
+
+
+# Outgoing messages buffered per connection before thinking deltas start being coalesced
+OUTBOX_MAXSIZE = 64
+
+
+def _delta_stream(delta: dict) -> tuple:
+    return delta["claim_id"], delta["phase"], delta.get("is_refined", False)
+
+
+class ConnectionOutbox:
+    """
+    FIFO of serialized messages waiting to be written to one WebSocket.
+
+    Producers never wait on the network. Once the outbox is full, a thinking
+    delta is merged into the queued delta of its stream (unless another frame
+    was queued after it), so the client still receives every character in
+    order; nothing is ever dropped.
+    """
+
+    def __init__(self, encode_delta: Callable[[dict], str], maxsize: int = OUTBOX_MAXSIZE):
+        self.maxsize = maxsize
+        self._encode_delta = encode_delta
+        # [payload, delta frame data or None]
+        self._items: deque = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, payload: str, delta: Optional[dict] = None):
+        if delta is not None and len(self._items) >= self.maxsize and self._coalesce(delta):
+            return
+        self._items.append([payload, delta])
+        self._ready.set()
+
+    def _coalesce(self, delta: dict) -> bool:
+        """Append delta's text to the newest queued delta of its stream, if no other frame follows it."""
+        stream = _delta_stream(delta)
+        for item in reversed(self._items):
+            queued = item[1]
+            if queued is None:
+                return False
+            if _delta_stream(queued) == stream:
+                merged = {**queued, "delta": queued.get("delta", "") + delta.get("delta", "")}
+                if "accumulated_len" in delta:
+                    merged["accumulated_len"] = delta["accumulated_len"]
+                item[0] = self._encode_delta(merged)
+                item[1] = merged
+                return True
+        return False
+
+    async def get(self) -> str:
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        payload, _ = self._items.popleft()
+        return payload
+
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time communication."""
     
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        # Copy-on-write: each session maps to an immutable set that connect/disconnect
+        # replace wholesale, so broadcasts can iterate it without copying or locking
+        self.active_connections: Dict[str, FrozenSet[WebSocket]] = {}
+        # Serialized envelope prefixes of delta streams, keyed by (claim_id, phase, is_refined)
+        self._delta_prefixes: Dict[tuple, bytes] = {}
+        # Each socket gets its own outbox and writer task, so a slow client
+        # never holds up the producers or the session's other clients
+        self._outboxes: Dict[WebSocket, Tuple[ConnectionOutbox, asyncio.Task]] = {}
     
     async def connect(self, websocket: WebSocket, session_id: str):
         """Accept and register a new WebSocket connection."""
         await websocket.accept()
         
-        if session_id not in self.active_connections:
-            self.active_connections[session_id] = []
+        outbox = ConnectionOutbox(self._encode_delta_frame)
+        writer = asyncio.create_task(self._write_loop(websocket, session_id, outbox))
+        self._outboxes[websocket] = (outbox, writer)
         
-        self.active_connections[session_id].append(websocket)
+        self.active_connections[session_id] = self.active_connections.get(session_id, frozenset()) | {websocket}
         logger.info(f"WebSocket connected: session={session_id}, total={len(self.active_connections[session_id])}")
     
     def disconnect(self, websocket: WebSocket, session_id: str):
         """Remove a WebSocket connection."""
-        if session_id in self.active_connections:
-            if websocket in self.active_connections[session_id]:
-                self.active_connections[session_id].remove(websocket)
-                logger.info(f"WebSocket disconnected: session={session_id}")
-            
-            # Clean up empty session lists
-            if not self.active_connections[session_id]:
+        entry = self._outboxes.pop(websocket, None)
+        if entry is not None and entry[1] is not asyncio.current_task():
+            entry[1].cancel()
+        
+        connections = self.active_connections.get(session_id)
+        if connections is not None and websocket in connections:
+            remaining = connections - {websocket}
+            # Clean up empty session sets
+            if remaining:
+                self.active_connections[session_id] = remaining
+            else:
                 del self.active_connections[session_id]
+            logger.info(f"WebSocket disconnected: session={session_id}")
+    
+    def is_connected(self, session_id: str) -> bool:
+        """Whether any WebSocket is currently registered for the session."""
+        return session_id in self.active_connections
     
     async def send_message(self, session_id: str, message: dict):
         """Send a message to all connections for a session."""
@@ -46,46 +142,109 @@ class ConnectionManager:
         
         # Add timestamp if not present
         if "timestamp" not in message:
-            message["timestamp"] = datetime.utcnow().isoformat()
+            message["timestamp"] = _timestamp()
         
-        disconnected = []
-        for connection in self.active_connections[session_id]:
+        # Serialize once per broadcast rather than once per connection
+        self._enqueue(session_id, orjson.dumps(message, option=_JSON_OPTIONS).decode())
+    
+    def _enqueue(self, session_id: str, payload: str, delta: Optional[dict] = None):
+        """
+        Queue an already-serialized message on the outbox of every socket in the session.
+        Thinking deltas also pass their frame data so a backed-up outbox can merge them.
+        """
+        for connection in self.active_connections.get(session_id, ()):
+            entry = self._outboxes.get(connection)
+            if entry is not None:
+                entry[0].put(payload, delta)
+    
+    async def _write_loop(self, websocket: WebSocket, session_id: str, outbox: ConnectionOutbox):
+        """Drain one socket's outbox until it closes or a send fails."""
+        while True:
+            payload = await outbox.get()
+            if websocket.client_state != WebSocketState.CONNECTED:
+                break
             try:
-                await connection.send_json(message)
+                await websocket.send_text(payload)
             except Exception as e:
                 logger.error(f"Error sending message: {e}")
-                disconnected.append(connection)
+                break
         
-        # Clean up disconnected connections
-        for conn in disconnected:
-            self.disconnect(conn, session_id)
+        # Clean up the disconnected connection
+        self.disconnect(websocket, session_id)
     
     async def broadcast_thinking_update(self, session_id: str, thinking_data: dict):
         """Stream thinking process update to frontend."""
+        # Nobody is watching: skip building and serializing the frame
+        if session_id not in self.active_connections:
+            return
+        
+        if thinking_data.get("is_delta") and thinking_data.keys() <= _DELTA_FRAME_KEYS:
+            # Hot path: only the delta text changes between frames of one stream
+            self._enqueue(session_id, self._encode_delta_frame(thinking_data), delta=thinking_data)
+            return
+        
         message = {
             "type": "thinking_update",
             "data": thinking_data
         }
         await self.send_message(session_id, message)
     
+    def _encode_delta_frame(self, thinking_data: dict) -> str:
+        """Serialize a thinking delta, reusing the pre-serialized envelope of its stream."""
+        key = (thinking_data["claim_id"], thinking_data["phase"], thinking_data.get("is_refined", False))
+        prefix = self._delta_prefixes.get(key)
+        if prefix is None:
+            if len(self._delta_prefixes) >= DELTA_PREFIX_CACHE_SIZE:
+                self._delta_prefixes.clear()
+            envelope = orjson.dumps({
+                "type": "thinking_update",
+                "data": {
+                    "claim_id": key[0],
+                    "phase": key[1],
+                    "is_refined": key[2],
+                    "is_delta": True
+                }
+            })
+            # Drop the closing '}}' so the varying fields can be appended
+            prefix = envelope[:-2] + b',"delta":'
+            self._delta_prefixes[key] = prefix
+        
+        parts = [prefix, orjson.dumps(thinking_data.get("delta", ""))]
+        if "accumulated_len" in thinking_data:
+            parts.append(b',"accumulated_len":%d' % thinking_data["accumulated_len"])
+        parts.append(b'},"timestamp":' + orjson.dumps(_timestamp()) + b'}')
+        return b"".join(parts).decode()
+    
     async def broadcast_verification_result(self, session_id: str, result: dict):
         """Send verification result to frontend."""
+        if session_id not in self.active_connections:
+            return
+        
         message = {
             "type": "verification_result",
             "data": result
         }
         await self.send_message(session_id, message)
     
-    async def broadcast_claim_extraction(self, session_id: str, claims: List[dict]):
-        """Send extracted claims to frontend."""
+    async def broadcast_claim_extraction(self, session_id: str, claims: List[dict], partial: bool = False):
+        """
+        Send extracted claims to frontend.
+        Partial frames carry claims streamed mid-extraction; the final frame has the full validated list.
+        """
+        if session_id not in self.active_connections:
+            return
+        
         message = {
             "type": "claims_extracted",
-            "data": {"claims": claims}
+            "data": {"claims": claims, "partial": partial}
         }
         await self.send_message(session_id, message)
     
     async def broadcast_error(self, session_id: str, error: str):
         """Send error message to frontend."""
+        if session_id not in self.active_connections:
+            return
+        
         message = {
             "type": "error",
             "data": {"error": error}
@@ -94,6 +253,9 @@ class ConnectionManager:
     
     async def broadcast_status(self, session_id: str, status: str, details: dict = None):
         """Send status update to frontend."""
+        if session_id not in self.active_connections:
+            return
+        
         message = {
             "type": "status",
             "data": {
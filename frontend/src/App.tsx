@@ -56,6 +56,7 @@ function App() {
 
     // Refs for synchronization
     const pendingClaimsRef = React.useRef<any[] | null>(null);
+    const streamingClaimsRef = React.useRef(false);
     const pendingResultsRef = React.useRef<{ [claimId: string]: any }>({});
     const { thinkingUpdates, setThinkingDisplayComplete } = useAppStore();
 
@@ -77,6 +78,14 @@ function App() {
                     break;
 
                 case 'claims_extracted':
+                    if (message.data.partial) {
+                        // Claims streamed mid-extraction: show them early, the final frame replaces them
+                        const streamed = streamingClaimsRef.current ? useAppStore.getState().extractedClaims : [];
+                        streamingClaimsRef.current = true;
+                        setExtractedClaims([...streamed, ...message.data.claims]);
+                        break;
+                    }
+                    streamingClaimsRef.current = false;
                     pendingClaimsRef.current = message.data.claims;
                     setExtractedClaims(message.data.claims);
                     setStatusMessage('Finishing analysis...');
@@ -91,6 +100,10 @@ function App() {
                         if (message.data.status === 'extracting' || message.data.status === 'verifying') {
                             setFocusPane('thinking');
                         }
+                        if (message.data.status === 'extracting') {
+                            // A new extraction starts a fresh stream of partial claims
+                            streamingClaimsRef.current = false;
+                        }
                     }
                     break;
 
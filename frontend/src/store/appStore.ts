@@ -8,6 +8,8 @@ export interface ThinkingUpdate {
     claim_id: string;
     phase: string;
     message: string;
+    delta?: string; // Incremental text on is_delta frames (appended to message)
+    accumulated_len?: number; // Length of the full streamed text after this delta
     is_native_thought?: boolean;
     is_refined?: boolean;
     is_delta?: boolean;
@@ -123,7 +125,7 @@ export const useAppStore = create<AppState>((set, get) => ({
             }
         }
 
-        // 2. Handle Refined Narrative Streaming (REPLACE if same phase)
+        // 2. Handle Refined Narrative Streaming (APPEND deltas, REPLACE on completion)
         if (update.is_delta || update.is_streaming_complete) {
             const existingIndex = thinkingUpdates.findIndex(u =>
                 u.claim_id === update.claim_id &&
@@ -131,6 +133,18 @@ export const useAppStore = create<AppState>((set, get) => ({
                 (u.is_delta || u.is_refined)
             );
 
+            if (update.is_delta) {
+                // Delta frames only carry the new text since the previous frame
+                // (a frame holding the whole stream so far starts over, e.g. after a retried attempt)
+                const delta = update.delta ?? '';
+                const restarted = update.accumulated_len !== undefined && update.accumulated_len === delta.length;
+                const previous = existingIndex !== -1 && !restarted ? thinkingUpdates[existingIndex].message : '';
+                update = { ...update, message: previous + delta };
+                if (update.accumulated_len !== undefined && update.message.length !== update.accumulated_len) {
+                    console.warn(`Thinking stream out of sync for ${update.claim_id} ${update.phase}`);
+                }
+            }
+
             if (existingIndex !== -1) {
                 const newUpdates = [...thinkingUpdates];
                 newUpdates[existingIndex] = update;